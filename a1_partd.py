@@ -2,42 +2,108 @@
 #    Main Author(s):Ahmed Kursi
 #    Main Reviewer(s):
 
+from array import array
+
 from a1_partc import Queue
+from flatboard import FlatBoard
+
+# NumPy is optional, without it overflow_numpy is unavailable and run_overflow uses the pure-Python engine
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Returns a copy of the grid in its own format (list of lists or FlatBoard)
+def copy_grid(grid):
+    if isinstance(grid, FlatBoard):
+        return grid.copy()
+    return [row[:] for row in grid]
+
+# Overflow thresholds and neighbours of every cell of a rows x cols grid, indexed by
+# the flat index row * cols + col. Built once per grid shape by get_geometry
+class Geometry:
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+        self.size = rows * cols
+        # A cell overflows when it holds at least thresholds[index] pieces:
+        # 2 in a corner, 3 on an edge, 4 inside
+        self.thresholds = []
+        # Flat indices of the cells next to each cell, in the order up, down, left, right
+        self.neighbors = []
+        for row in range(rows):
+            for col in range(cols):
+                on_row_edge = row == 0 or row == rows - 1
+                on_col_edge = col == 0 or col == cols - 1
+                if on_row_edge and on_col_edge:
+                    self.thresholds.append(2)
+                elif on_row_edge or on_col_edge:
+                    self.thresholds.append(3)
+                else:
+                    self.thresholds.append(4)
+                index = row * cols + col
+                cells = []
+                if row > 0:
+                    cells.append(index - cols)
+                if row < rows - 1:
+                    cells.append(index + cols)
+                if col > 0:
+                    cells.append(index - 1)
+                if col < cols - 1:
+                    cells.append(index + 1)
+                self.neighbors.append(tuple(cells))
+
+_geometries = {}
+
+# Returns the shared Geometry of rows x cols grids
+def get_geometry(rows, cols):
+    if (rows, cols) not in _geometries:
+        _geometries[(rows, cols)] = Geometry(rows, cols)
+    return _geometries[(rows, cols)]
+
+# Returns the geometry of a grid in either format
+def grid_geometry(grid):
+    if isinstance(grid, FlatBoard):
+        return get_geometry(grid.rows, grid.cols)
+    return get_geometry(len(grid), len(grid[0]))
 
 def get_overflow_list(grid):
-    def is_overflow(row, col, cell, r, c):
-        if (row ==0 and col==0 )or (row ==0 and col==c-1) or (row ==r-1 and col==0) or (row ==r-1 and col==c-1):
-            return abs(cell) >1
-        elif row==0 or col==0 or row==r-1 or col==c-1:
-            return abs(cell) >2
-        else:
-            return abs(cell)>3
+    geometry = grid_geometry(grid)
+    thresholds = geometry.thresholds
+    cols = geometry.cols
+    # A FlatBoard is scanned directly, a list-of-lists board is flattened first
+    cells = grid.cells if isinstance(grid, FlatBoard) else [cell for row in grid for cell in row]
 
     overflow_list = []
-    for r in range(len(grid)):
-        for c in range(len(grid[r])):
-            if is_overflow(r, c, grid[r][c], len(grid), len(grid[0])):
-                overflow_list.append((r, c))
+    # No cell overflows with less than two pieces, so most cells skip the threshold lookup
+    for index, cell in enumerate(cells):
+        if (cell > 1 or cell < -1) and abs(cell) >= thresholds[index]:
+            overflow_list.append((index // cols, index % cols))
 
-    # print(overflow_list)
     return overflow_list if len(overflow_list)!=0 else None
 
-def overflow(grid, a_queue):
+# If touched is a dict, every cell the cascade writes to is recorded in it as
+# (row, col) -> value before the cascade, so callers can update state for the changed cells only
+def overflow(grid, a_queue, touched=None):
+    def remember(r, c):
+        if touched is not None and (r, c) not in touched:
+            touched[(r, c)] = grid[r][c]
+
+    geometry = grid_geometry(grid)
+
     def spread_overflow(row, col, isNegative):
-        neighbors = [
-            (row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1)
-        ]
+        neighbors = [divmod(index, geometry.cols) for index in geometry.neighbors[row * geometry.cols + col]]
 
         for r, c in neighbors:
-            if 0 <= r < len(grid) and 0 <= c < len(grid[0]):
-                if grid[r][c] < 0:
-                    grid[r][c] -= 1
-                else:
-                    grid[r][c] +=1
+            remember(r, c)
+            if grid[r][c] < 0:
+                grid[r][c] -= 1
+            else:
+                grid[r][c] +=1
         for r, c in neighbors:
-            if isNegative and 0 <= r < len(grid) and 0 <= c < len(grid[0]) and grid[r][c] >0:
+            if isNegative and grid[r][c] >0:
                 grid[r][c]*=-1
-            if not isNegative and 0 <= r < len(grid) and 0 <= c < len(grid[0]) and grid[r][c] <0:
+            if not isNegative and grid[r][c] <0:
                 grid[r][c]*=-1
 
     steps = 0
@@ -48,6 +114,7 @@ def overflow(grid, a_queue):
 
         for r, c in overflow_list:
             isNegative = (grid[r][c]<0)
+            remember(r, c)
             if (r, c-1) not in overflow_list and (r-1,c) not in overflow_list:
                 grid[r][c] = 0
             if (r, c-1) in overflow_list:
@@ -57,7 +124,7 @@ def overflow(grid, a_queue):
 
             spread_overflow(r, c, isNegative)
 
-        a_queue.enqueue([row[:] for row in grid])
+        a_queue.enqueue(copy_grid(grid))
         steps += 1
         #Modified for partA
         negativeSign = True
@@ -69,6 +136,239 @@ def overflow(grid, a_queue):
                 if cell < 0:
                     positiveSign = False
         if negativeSign or positiveSign:
-            a_queue.enqueue([row[:] for row in grid])
+            a_queue.enqueue(copy_grid(grid))
+            return 2
+    return steps
+
+# Same cascade as overflow, wave by wave, but each wave only looks at the cells the
+# previous wave wrote to: a cell nothing touched cannot have started overflowing.
+# Overflowing cells are kept in a set for the neighbour checks, and a running count
+# of negative cells replaces the full-grid scan for a winner after every wave.
+#
+# start can list the (row, col) cells changed since the grid was last stable (usually
+# just the cell that was played), then the first wave only looks at those too; by
+# default it scans the whole grid like overflow. a_queue can be None when only the
+# final grid is needed, then no copy is made per wave. touched works as in overflow.
+# negatives is the number of cells player -1 owns, if the caller already keeps count
+def overflow_worklist(grid, a_queue, touched=None, start=None, negatives=None):
+    geometry = grid_geometry(grid)
+    rows = geometry.rows
+    cols = geometry.cols
+    size = geometry.size
+    thresholds = geometry.thresholds
+    neighbors = geometry.neighbors
+    # Work on flat cells: the FlatBoard's own array, or a flat copy of the lists written back at the end
+    cells = grid.cells if isinstance(grid, FlatBoard) else [cell for row in grid for cell in row]
+
+    def snapshot():
+        if isinstance(grid, FlatBoard):
+            return grid.copy()
+        return [cells[r * cols:(r + 1) * cols] for r in range(rows)]
+
+    def write_back():
+        if not isinstance(grid, FlatBoard):
+            for r in range(rows):
+                grid[r][:] = cells[r * cols:(r + 1) * cols]
+
+    # Number of cells owned by player -1, kept up to date on every write
+    if negatives is None:
+        negatives = 0
+        for cell in cells:
+            if cell < 0:
+                negatives += 1
+
+    if start is None:
+        frontier = range(size)
+    else:
+        frontier = [row * cols + col for (row, col) in start]
+
+    steps = 0
+    while True:
+        # Row-major order matters: a cell's new value depends on the cells before it in the wave
+        wave = sorted(index for index in set(frontier) if (cells[index] > 1 or cells[index] < -1) and abs(cells[index]) >= thresholds[index])
+        if not wave:
+            break
+        in_wave = set(wave)
+        next_frontier = set()
+
+        for index in wave:
+            isNegative = cells[index] < 0
+            left = index % cols > 0 and index - 1 in in_wave
+            up = index >= cols and index - cols in in_wave
+            old = cells[index]
+            if touched is not None and divmod(index, cols) not in touched:
+                touched[divmod(index, cols)] = old
+            # Same reset rule as overflow: 0 when neither the cell above nor the one
+            # to the left overflowed, 1 when the one to the left did, else unchanged
+            if not left and not up:
+                cells[index] = 0
+            elif left:
+                cells[index] = 1
+            negatives += (cells[index] < 0) - (old < 0)
+            next_frontier.add(index)
+
+            for neighbor in neighbors[index]:
+                old = cells[neighbor]
+                if touched is not None and divmod(neighbor, cols) not in touched:
+                    touched[divmod(neighbor, cols)] = old
+                # One more piece, which then takes the colour of the overflowing cell
+                new = old - 1 if old < 0 else old + 1
+                if (isNegative and new > 0) or (not isNegative and new < 0):
+                    new = -new
+                cells[neighbor] = new
+                negatives += (new < 0) - (old < 0)
+                next_frontier.add(neighbor)
+
+        if a_queue is not None:
+            a_queue.enqueue(snapshot())
+        steps += 1
+        # One player owns everything: no negative cell at all, or only negative cells
+        if negatives == 0 or negatives == size:
+            write_back()
+            if a_queue is not None:
+                a_queue.enqueue(snapshot())
+            return 2
+        frontier = next_frontier
+
+    write_back()
+    return steps
+
+# Same cascade as overflow, computed with NumPy one whole wave at a time. Within a
+# wave overflow works through the cells in row-major order, so what a cell ends up
+# with depends on which of its neighbours overflow before it (above, left) and after
+# it (right, below). That makes every cell's new value a closed formula of the wave's
+# overflow mask; the only sequential part is the colour each overflowing cell spreads,
+# which it takes from the overflowing cell to its left, else the one above, else its own
+def overflow_numpy(grid, a_queue, touched=None):
+    if numpy is None:
+        raise RuntimeError('overflow_numpy() needs NumPy')
+    geometry = grid_geometry(grid)
+    rows = geometry.rows
+    cols = geometry.cols
+    flat = isinstance(grid, FlatBoard)
+    if flat:
+        values = numpy.frombuffer(grid.cells, dtype=numpy.int8).astype(numpy.int64).reshape(rows, cols)
+    else:
+        values = numpy.array(grid, dtype=numpy.int64)
+    initial = values.copy()
+    thresholds = _numpy_thresholds(geometry)
+    ever_touched = numpy.zeros((rows, cols), dtype=bool)
+    columns = numpy.arange(cols)
+
+    def shifted(mask, row_step, col_step):
+        # result[r][c] = mask[r - row_step][c - col_step], False outside the grid
+        result = numpy.zeros_like(mask)
+        source = mask[max(0, -row_step):rows - max(0, row_step), max(0, -col_step):cols - max(0, col_step)]
+        result[max(0, row_step):rows - max(0, -row_step), max(0, col_step):cols - max(0, -col_step)] = source
+        return result
+
+    def snapshot():
+        if flat:
+            return FlatBoard(rows, cols, array('b', values.astype(numpy.int8).tobytes()))
+        return values.tolist()
+
+    def write_back():
+        if flat:
+            grid.cells[:] = array('b', values.astype(numpy.int8).tobytes())
+        else:
+            for r in range(rows):
+                grid[r][:] = values[r].tolist()
+        if touched is not None:
+            for r, c in zip(*numpy.nonzero(ever_touched)):
+                touched.setdefault((int(r), int(c)), int(initial[r, c]))
+
+    steps = 0
+    while True:
+        wave = numpy.abs(values) >= thresholds
+        if not wave.any():
+            break
+        up = shifted(wave, 1, 0)       # the cell above overflows
+        left = shifted(wave, 0, 1)     # the cell to the left overflows
+        right = shifted(wave, 0, -1)   # the cell to the right overflows
+        down = shifted(wave, -1, 0)    # the cell below overflows
+
+        # Colour each overflowing cell spreads (True for player -1), one row at a time:
+        # a run of overflowing cells takes the colour of its first cell, which has it from
+        # the overflowing cell above or else from its own sign
+        negative = numpy.zeros((rows, cols), dtype=bool)
+        for r in range(rows):
+            above = negative[r - 1] if r > 0 else numpy.zeros(cols, dtype=bool)
+            head_colour = numpy.where(up[r], above, values[r] < 0)
+            heads = wave[r] & ~left[r]
+            run_head = numpy.maximum.accumulate(numpy.where(heads, columns, 0))
+            negative[r] = head_colour[run_head] & wave[r]
+
+        # Colour of the last neighbour to spread before / after the cell
+        last_before = numpy.where(left, shifted(negative, 0, 1), shifted(negative, 1, 0))
+        last_after = numpy.where(down, shifted(negative, -1, 0), shifted(negative, 0, -1))
+        before = up.astype(numpy.int64) + left
+        after = right.astype(numpy.int64) + down
+        magnitude = numpy.abs(values)
+
+        # Cells that do not overflow gain one piece per overflowing neighbour and end
+        # with the colour of the last one to spread into them
+        outside_size = magnitude + before + after
+        outside_negative = numpy.where(after > 0, last_after, numpy.where(before > 0, last_before, values < 0))
+
+        # Overflowing cells are reset to 0, to 1 (left neighbour overflowed) or keep what
+        # they have (only the one above overflowed), then gain what comes after them
+        base = numpy.where(left, 1, numpy.where(up, magnitude + 1, 0))
+        base_negative = numpy.where(left, False, numpy.where(up, negative, False))
+        inside_size = base + after
+        inside_negative = numpy.where(after > 0, last_after, base_negative)
+
+        size = numpy.where(wave, inside_size, outside_size)
+        is_negative = numpy.where(wave, inside_negative, outside_negative)
+        values = numpy.where(is_negative, -size, size)
+        ever_touched |= wave | up | down | left | right
+
+        if a_queue is not None:
+            a_queue.enqueue(snapshot())
+        steps += 1
+        negatives = int(numpy.count_nonzero(values < 0))
+        if negatives == 0 or negatives == geometry.size:
+            write_back()
+            if a_queue is not None:
+                a_queue.enqueue(snapshot())
             return 2
+
+    write_back()
     return steps
+
+# NumPy copy of a geometry's thresholds, built once per shape
+_numpy_threshold_tables = {}
+
+def _numpy_thresholds(geometry):
+    key = (geometry.rows, geometry.cols)
+    if key not in _numpy_threshold_tables:
+        _numpy_threshold_tables[key] = numpy.array(geometry.thresholds, dtype=numpy.int64).reshape(geometry.rows, geometry.cols)
+    return _numpy_threshold_tables[key]
+
+# Engine used by run_overflow: 'python' (overflow_worklist), 'numpy' (overflow_numpy)
+# or 'auto', which picks NumPy for grids of at least NUMPY_MIN_CELLS cells when it is
+# installed. NumPy pays for its per-wave overhead from about 24x24 on dense cascades
+# (python benchmark.py overflow); on small grids, or when a wave only touches a thin
+# front of cells, the worklist engine is faster
+overflow_backend = 'auto'
+NUMPY_MIN_CELLS = 576
+
+# Chooses the engine run_overflow uses from now on
+def set_overflow_backend(name):
+    global overflow_backend
+    if name not in ('python', 'numpy', 'auto'):
+        raise ValueError(f"unknown overflow backend {name!r}")
+    if name == 'numpy' and numpy is None:
+        raise RuntimeError('the numpy overflow backend needs NumPy')
+    overflow_backend = name
+
+# Resolves the overflow of a grid with the selected engine, same arguments and result as overflow.
+# start (the only cells that may overflow) and negatives (the number of cells player -1 owns)
+# let the worklist engine skip its first scan of the grid; the NumPy engine scans every wave anyway
+def run_overflow(grid, a_queue, touched=None, start=None, negatives=None):
+    backend = overflow_backend
+    if backend == 'auto':
+        use_numpy = numpy is not None and grid_geometry(grid).size >= NUMPY_MIN_CELLS
+        backend = 'numpy' if use_numpy else 'python'
+    if backend == 'numpy':
+        return overflow_numpy(grid, a_queue, touched)
+    return overflow_worklist(grid, a_queue, touched, start, negatives)
@@ -1,24 +1,183 @@
 #    Main Author(s): Ahmed kursi
 #    Main Reviewer(s): 
 
+import sys
+from array import array
+
 class HashTable:
     """
     A hash table that stores key-value pairs and resolves collisions using separate chaining.
     It supports insertion, modification, removal, search, and resizing of the table when the load factor exceeds a threshold
+    In incremental mode the resize is spread over the following operations, so no single insert has to rehash the whole table.
     """
 
-    def __init__(self, cap=32):
+    def __init__(self, cap=32, incremental=False, rehash_buckets=4, expected=None):
         """
         Initializes the hash table with a given initial capacity.
         
         Args:
             cap (int): The initial number of slots in the table. Defaults to 32.
+            incremental (bool): Whether to move the entries to the doubled table a few buckets at a time. Defaults to False.
+            rehash_buckets (int): In incremental mode, the number of non-empty buckets moved by each operation. Defaults to 4.
+            expected (int): Optional number of entries the table will hold. The capacity is doubled from cap
+                until that many entries fit without a resize.
         
         This constructor sets up the internal table with a specified capacity and initializes the size to 0.
         """
+        if expected is not None:
+            cap = _presized(cap, expected, 0.7)
         self._capacity = cap
         self.size = 0
         self.table = [None] * self._capacity
+        self.incremental = incremental
+        self.rehash_buckets = rehash_buckets
+        # While an incremental resize is running, the table being emptied and the next bucket to move from it
+        self._old_table = None
+        self._old_capacity = 0
+        self._rehash_index = 0
+
+    def insert_many(self, pairs):
+        """
+        Inserts many key-value pairs. Keys already in the table (or repeated in pairs) are left as they are.
+        
+        Args:
+            pairs (Iterable): (key, value) pairs.
+        
+        Returns:
+            int: The number of pairs inserted.
+        
+        When the number of pairs is known, the table is resized once up front, and the load factor is only
+        compared against a precomputed entry count instead of being recomputed for every pair.
+        """
+        return self._bulk_load(pairs, False)
+
+    def update(self, pairs):
+        """
+        Inserts or replaces many key-value pairs, like dict.update.
+        
+        Args:
+            pairs (HashTable, dict or Iterable): A table or dict to copy the entries of, or (key, value) pairs.
+        """
+        if isinstance(pairs, (HashTable, dict)):
+            pairs = pairs.items()
+        self._bulk_load(pairs, True)
+
+    def _bulk_load(self, pairs, replace):
+        """
+        Shared by insert_many and update. Returns the number of new keys.
+        """
+        if hasattr(pairs, '__len__'):
+            self._reserve(self.size + len(pairs))
+        inserted = 0
+        limit = int(self._capacity * 0.7)
+        for key, value in pairs:
+            if self._old_table is not None:
+                self._rehash_step()
+                old_chain = self._old_chain(key)
+            else:
+                old_chain = None
+            found = False
+            for chain in (old_chain, self.table[hash(key) % self._capacity]):
+                if chain is not None:
+                    for i, item in enumerate(chain):
+                        if item[0] == key:
+                            if replace:
+                                chain[i] = (key, value)
+                            found = True
+                            break
+                if found:
+                    break
+            if found:
+                continue
+            index = hash(key) % self._capacity
+            if self.table[index] is None:
+                self.table[index] = [(key, value)]
+            else:
+                self.table[index].append((key, value))
+            self.size += 1
+            inserted += 1
+            if self.size > limit:
+                self._resize()
+                limit = int(self._capacity * 0.7)
+        return inserted
+
+    def _reserve(self, count):
+        """
+        Resizes the table once, all at once, so that count entries fit without another resize.
+        """
+        capacity = _presized(self._capacity, count, 0.7)
+        if capacity == self._capacity:
+            return
+        while self._old_table is not None:
+            self._rehash_step()
+        old_table = self.table
+        self._capacity = capacity
+        self.table = [None] * capacity
+        for chain in old_table:
+            if chain is not None:
+                self._move_chain(chain)
+
+    def items(self):
+        """
+        Returns a lazy iterator over the (key, value) pairs in the table, in no particular order.
+        Nothing is copied, so the table must not be changed (or searched, in incremental mode) while iterating.
+        """
+        for table in (self._old_table, self.table):
+            if table is not None:
+                for chain in table:
+                    if chain is not None:
+                        yield from chain
+
+    def keys(self):
+        """
+        Returns a lazy iterator over the keys in the table, see items().
+        """
+        for key, value in self.items():
+            yield key
+
+    def values(self):
+        """
+        Returns a lazy iterator over the values in the table, see items().
+        """
+        for key, value in self.items():
+            yield value
+
+    def __iter__(self):
+        """
+        Iterates over the keys in the table, like a dict.
+        """
+        return self.keys()
+
+    def memory_usage(self):
+        """
+        Estimates the memory the table uses, in bytes.
+        
+        Returns:
+            dict: 'slots' for the bucket arrays, 'keys' and 'values' for the objects stored (counted shallowly),
+            'overhead' for the bucket lists, the entry tuples and the table object itself, and 'total'.
+        """
+        usage = {'slots': 0, 'keys': 0, 'values': 0, 'overhead': sys.getsizeof(self) + sys.getsizeof(self.__dict__)}
+        for table in (self._old_table, self.table):
+            if table is None:
+                continue
+            usage['slots'] += sys.getsizeof(table)
+            for chain in table:
+                if chain is not None:
+                    usage['overhead'] += sys.getsizeof(chain)
+                    for item in chain:
+                        usage['overhead'] += sys.getsizeof(item)
+                        usage['keys'] += sys.getsizeof(item[0])
+                        usage['values'] += sys.getsizeof(item[1])
+        usage['total'] = sum(usage.values())
+        return usage
+
+    def _old_chain(self, key):
+        """
+        Returns the bucket of the table being emptied that may still hold the key, or None.
+        """
+        if self._old_table is None:
+            return None
+        return self._old_table[hash(key) % self._old_capacity]
 
     def insert(self, key, value):
         """
@@ -33,6 +192,13 @@ class HashTable:
         
         If the number of stored elements exceeds 70% of the table's capacity, the table will be resized.
         """
+        if self._old_table is not None:
+            self._rehash_step()
+            old_chain = self._old_chain(key)
+            if old_chain is not None:
+                for item in old_chain:
+                    if item[0] == key:
+                        return False
         index = hash(key) % self._capacity
         if self.table[index] is not None:
             for item in self.table[index]:
@@ -60,12 +226,14 @@ class HashTable:
         
         This function allows the modification of an existing key-value pair.
         """
-        index = hash(key) % self._capacity
-        if self.table[index] is not None:
-            for i, item in enumerate(self.table[index]):
-                if item[0] == key:
-                    self.table[index][i] = (key, value)
-                    return True
+        if self._old_table is not None:
+            self._rehash_step()
+        for chain in (self.table[hash(key) % self._capacity], self._old_chain(key)):
+            if chain is not None:
+                for i, item in enumerate(chain):
+                    if item[0] == key:
+                        chain[i] = (key, value)
+                        return True
         return False
 
     def remove(self, key):
@@ -80,15 +248,20 @@ class HashTable:
         
         This function removes a key-value pair and adjusts the table accordingly.
         """
-        index = hash(key) % self._capacity
-        if self.table[index] is not None:
-            for i, item in enumerate(self.table[index]):
-                if item[0] == key:
-                    self.table[index].pop(i)
-                    if len(self.table[index]) == 0:
-                        self.table[index] = None
-                    self.size -= 1
-                    return True
+        if self._old_table is not None:
+            self._rehash_step()
+        for table, capacity in ((self.table, self._capacity), (self._old_table, self._old_capacity)):
+            if table is None:
+                continue
+            index = hash(key) % capacity
+            if table[index] is not None:
+                for i, item in enumerate(table[index]):
+                    if item[0] == key:
+                        table[index].pop(i)
+                        if len(table[index]) == 0:
+                            table[index] = None
+                        self.size -= 1
+                        return True
         return False
 
     def search(self, key):
@@ -103,6 +276,13 @@ class HashTable:
         
         This function allows retrieval of the value for a specific key in the table.
         """
+        if self._old_table is not None:
+            self._rehash_step()
+            old_chain = self._old_chain(key)
+            if old_chain is not None:
+                for item in old_chain:
+                    if item[0] == key:
+                        return item[1]
         index = hash(key) % self._capacity
         if self.table[index] is not None:
             for item in self.table[index]:
@@ -118,6 +298,7 @@ class HashTable:
             int: The current capacity of the table.
         
         This function gives the number of available slots in the table, which is equal to the number of buckets in the hash table.
+        During an incremental resize it is the capacity of the doubled table.
         """
         return self._capacity
 
@@ -137,15 +318,550 @@ class HashTable:
         Resizes the table by doubling its capacity and rehashing all stored elements.
         
         This function is automatically called when the table's load factor exceeds 0.7.
+        The entries are known to be distinct, so they are appended to their new bucket without looking for duplicates.
+        In incremental mode only the doubled table is allocated here, and the entries follow a few buckets per operation.
         """
+        # A resize still running is finished first, so at most two tables exist at once
+        while self._old_table is not None:
+            self._rehash_step()
         old_table = self.table
         self._capacity *= 2
         self.table = [None] * self._capacity
-        self.size = 0
 
+        if self.incremental:
+            self._old_table = old_table
+            self._old_capacity = self._capacity // 2
+            self._rehash_index = 0
+            return
         for chain in old_table:
             if chain is not None:
-                for key, value in chain:
-                    self.insert(key, value)
+                self._move_chain(chain)
 
+    def _move_chain(self, chain):
+        """
+        Appends every entry of an old bucket to its bucket in the current table.
+        """
+        table = self.table
+        capacity = self._capacity
+        for item in chain:
+            index = hash(item[0]) % capacity
+            if table[index] is None:
+                table[index] = [item]
+            else:
+                table[index].append(item)
+
+    def _rehash_step(self):
+        """
+        Moves up to rehash_buckets non-empty buckets of the table being emptied to the current one,
+        looking at no more than ten times as many buckets, as Redis does. Ends the resize once the old table is empty.
+        """
+        old_table = self._old_table
+        index = self._rehash_index
+        end = min(self._old_capacity, index + 10 * self.rehash_buckets)
+        moved = 0
+        while index < end and moved < self.rehash_buckets:
+            chain = old_table[index]
+            if chain is not None:
+                self._move_chain(chain)
+                old_table[index] = None
+                moved += 1
+            index += 1
+        self._rehash_index = index
+        if index == self._old_capacity:
+            self._old_table = None
+            self._old_capacity = 0
+
+
+def _presized(cap, expected, max_load):
+    """
+    Returns cap doubled until expected entries fit in it without going over max_load.
+    """
+    while expected / cap > max_load:
+        cap *= 2
+    return cap
+
+
+class RobinHoodHashTable:
+    """
+    A hash table with the same interface as HashTable that stores key-value pairs in open addressing
+    with Robin Hood linear probing. Keys, values and hashes live in three parallel arrays, so an entry
+    costs no bucket list or tuple of its own.
+    An entry that is further from its home slot than the one it probes past takes that slot, which
+    keeps every probe sequence short, and removal shifts the following entries back instead of leaving tombstones.
+    The hashes are always a typed array, and keys and values can be typed arrays too when they are numbers
+    (such as 64-bit Zobrist keys), which brings an entry down to a few machine words.
+    """
+
+    def __init__(self, cap=32, max_load=0.85, key_type=None, value_type=None):
+        """
+        Initializes the hash table with a given initial capacity.
 
+        Args:
+            cap (int): The initial number of slots in the table. Defaults to 32.
+            max_load (float): The load factor above which the table doubles. Defaults to 0.85.
+            key_type (str): Optional array typecode the keys are stored as, e.g. 'Q' for unsigned 64-bit keys.
+                By default keys are kept in a list and can be any hashable object.
+            value_type (str): Optional array typecode the values are stored as, e.g. 'q'.
+
+        Raises:
+            ValueError: If max_load is not between 0 and 1 (excluded), since a full table has nowhere left to probe.
+        """
+        if not 0 < max_load < 1:
+            raise ValueError('max_load must be between 0 and 1')
+        self._capacity = cap
+        self.max_load = max_load
+        self.key_type = key_type
+        self.value_type = value_type
+        self.size = 0
+        self._keys = self._storage(key_type, cap)
+        self._values = self._storage(value_type, cap)
+        # Full hash of the key in each slot. Python never hashes anything to -1, so it marks an empty slot
+        self._hashes = array('q', [_EMPTY]) * cap
+
+    def _storage(self, typecode, cap):
+        """
+        Returns cap empty slots for keys or values: a typed array of zeros or a list of None.
+        """
+        if typecode is None:
+            return [None] * cap
+        return array(typecode, [0]) * cap
+
+    def _find(self, key, key_hash):
+        """
+        Returns the slot holding the key, or -1 if it is not in the table.
+
+        The probe stops at an empty slot, or at an entry closer to its home slot than the key
+        would be there, since Robin Hood insertion would have placed the key before that entry.
+        """
+        capacity = self._capacity
+        hashes = self._hashes
+        index = key_hash % capacity
+        # Most keys sit in their home slot
+        slot_hash = hashes[index]
+        if slot_hash == key_hash and self._keys[index] == key:
+            return index
+        distance = 0
+        while True:
+            if slot_hash == _EMPTY or (index - slot_hash) % capacity < distance:
+                return -1
+            if slot_hash == key_hash and self._keys[index] == key:
+                return index
+            index += 1
+            if index == capacity:
+                index = 0
+            distance += 1
+            slot_hash = hashes[index]
+
+    def _place(self, key, value, key_hash, check=False):
+        """
+        Puts a key into its slot, moving richer entries (closer to their home slot) further
+        along as it passes them. With check, the key is first looked for along the same probe.
+
+        Returns:
+            bool: False if check found the key already in the table, True once it is placed.
+        """
+        capacity = self._capacity
+        keys = self._keys
+        values = self._values
+        hashes = self._hashes
+        index = key_hash % capacity
+        distance = 0
+        while True:
+            slot_hash = hashes[index]
+            if slot_hash == _EMPTY:
+                keys[index] = key
+                values[index] = value
+                hashes[index] = key_hash
+                return True
+            if check and slot_hash == key_hash and keys[index] == key:
+                return False
+            slot_distance = (index - slot_hash) % capacity
+            if slot_distance < distance:
+                # The key would have been found by now, the rest of the probe only moves entries
+                check = False
+                keys[index], key = key, keys[index]
+                values[index], value = value, values[index]
+                hashes[index], key_hash = key_hash, slot_hash
+                distance = slot_distance
+            index += 1
+            if index == capacity:
+                index = 0
+            distance += 1
+
+    def insert(self, key, value):
+        """
+        Inserts a new key-value pair into the table. If the key already exists, the pair is not added.
+
+        Args:
+            key (Any): The key to be inserted into the table.
+            value (Any): The value associated with the key.
+
+        Returns:
+            bool: True if the key-value pair was successfully inserted, False if the key already exists.
+
+        If the number of stored elements exceeds max_load of the table's capacity, the table will be resized.
+        """
+        if not self._place(key, value, hash(key), True):
+            return False
+        self.size += 1
+
+        if self.size / self._capacity > self.max_load:
+            self._resize()
+        return True
+
+    def modify(self, key, value):
+        """
+        Modifies the value associated with an existing key in the table.
+
+        Args:
+            key (Any): The key whose value is to be modified.
+            value (Any): The new value to associate with the key.
+
+        Returns:
+            bool: True if the key was found and modified, False if the key was not found.
+        """
+        index = self._find(key, hash(key))
+        if index < 0:
+            return False
+        self._values[index] = value
+        return True
+
+    def remove(self, key):
+        """
+        Removes a key-value pair from the table.
+
+        Args:
+            key (Any): The key to be removed.
+
+        Returns:
+            bool: True if the key-value pair was successfully removed, False if the key was not found.
+
+        The entries after it that are away from their home slot are shifted back by one, so no tombstone is left behind.
+        """
+        index = self._find(key, hash(key))
+        if index < 0:
+            return False
+        capacity = self._capacity
+        keys = self._keys
+        values = self._values
+        hashes = self._hashes
+        while True:
+            following = (index + 1) % capacity
+            slot_hash = hashes[following]
+            if slot_hash == _EMPTY or (following - slot_hash) % capacity == 0:
+                break
+            keys[index] = keys[following]
+            values[index] = values[following]
+            hashes[index] = slot_hash
+            index = following
+        keys[index] = None if self.key_type is None else 0
+        values[index] = None if self.value_type is None else 0
+        hashes[index] = _EMPTY
+        self.size -= 1
+        return True
+
+    def search(self, key):
+        """
+        Searches for a key in the table and returns its associated value.
+
+        Args:
+            key (Any): The key to search for.
+
+        Returns:
+            Any: The value associated with the key if found, None if the key is not found.
+        """
+        index = self._find(key, hash(key))
+        if index < 0:
+            return None
+        return self._values[index]
+
+    def capacity(self):
+        """
+        Returns the current capacity of the table (the number of available slots).
+
+        Returns:
+            int: The current capacity of the table.
+        """
+        return self._capacity
+
+    def __len__(self):
+        """
+        Returns the number of elements currently stored in the hash table.
+
+        Returns:
+            int: The current number of elements in the table.
+        """
+        return self.size
+
+    def items(self):
+        """
+        Returns a lazy iterator over the (key, value) pairs in the table, in slot order.
+        Nothing is copied, so the table must not be changed while iterating.
+        """
+        for key, value, key_hash in zip(self._keys, self._values, self._hashes):
+            if key_hash != _EMPTY:
+                yield key, value
+
+    def memory_usage(self):
+        """
+        Estimates the memory the table uses, in bytes.
+
+        Returns:
+            dict: 'slots' for the hash array, 'keys' and 'values' for their arrays and the objects
+            they hold (counted shallowly, when not typed), 'overhead' for the table object itself, and 'total'.
+        """
+        usage = {
+            'slots': sys.getsizeof(self._hashes),
+            'keys': _stored_size(self._keys, self.key_type, self._hashes),
+            'values': _stored_size(self._values, self.value_type, self._hashes),
+            'overhead': sys.getsizeof(self) + sys.getsizeof(self.__dict__),
+        }
+        usage['total'] = sum(usage.values())
+        return usage
+
+    def _resize(self):
+        """
+        Resizes the table by doubling its capacity and placing all stored elements again.
+
+        The stored hashes are reused and the keys are known to be distinct, so nothing is hashed or compared again.
+        """
+        old_keys = self._keys
+        old_values = self._values
+        old_hashes = self._hashes
+        self._capacity *= 2
+        self._keys = self._storage(self.key_type, self._capacity)
+        self._values = self._storage(self.value_type, self._capacity)
+        self._hashes = array('q', [_EMPTY]) * self._capacity
+
+        for key, value, key_hash in zip(old_keys, old_values, old_hashes):
+            if key_hash != _EMPTY:
+                self._place(key, value, key_hash)
+
+
+# Hash marking an empty slot of a RobinHoodHashTable, hash() never returns it
+_EMPTY = -1
+
+def _stored_size(storage, typecode, hashes):
+    """
+    Size of a key or value array of a RobinHoodHashTable, plus the objects in its used slots when it is a list.
+    """
+    size = sys.getsizeof(storage)
+    if typecode is None:
+        size += sum(sys.getsizeof(item) for item, item_hash in zip(storage, hashes) if item_hash != _EMPTY)
+    return size
+
+
+class BoundedHashTable:
+    """
+    A hash table of fixed capacity for caches, such as a transposition table, that must not grow during a long run.
+    The slots are split into buckets of a few ways each. A key can only go into its own bucket, and when that bucket
+    is full one of its entries is replaced, chosen by the replacement policy:
+        'always'   one way, the new entry always replaces the old one
+        'depth'    one way, the new entry replaces the old one only if it was searched at least as deep
+        'two-tier' two ways, the first keeps the deepest entry and the second always takes the newest one
+        'lru'      several ways (4 by default), the least recently used entry is replaced
+    It has the same interface as HashTable, with an optional depth for insert and modify.
+    """
+
+    POLICIES = ('always', 'depth', 'two-tier', 'lru')
+
+    def __init__(self, cap=1024, policy='two-tier', ways=4):
+        """
+        Initializes an empty table with a fixed number of slots.
+
+        Args:
+            cap (int): The number of slots, rounded down to a whole number of buckets. Defaults to 1024.
+            policy (str): One of POLICIES. Defaults to 'two-tier'.
+            ways (int): Slots per bucket for the 'lru' policy. Defaults to 4.
+
+        Raises:
+            ValueError: If the policy is unknown or the capacity does not hold a single bucket.
+        """
+        if policy not in self.POLICIES:
+            raise ValueError(f'unknown replacement policy {policy!r}')
+        self.policy = policy
+        self.ways = {'always': 1, 'depth': 1, 'two-tier': 2, 'lru': ways}[policy]
+        self.buckets = cap // self.ways
+        if self.buckets < 1:
+            raise ValueError('capacity must hold at least one bucket')
+        self._capacity = self.buckets * self.ways
+        self.size = 0
+        self._keys = [None] * self._capacity
+        self._values = [None] * self._capacity
+        self._depths = [0] * self._capacity
+        # Last time each slot was used, for the 'lru' policy
+        self._used = [0] * self._capacity
+        self._clock = 0
+        # Number of inserts that found their bucket full, and of entries replaced because of it
+        self.collisions = 0
+        self.replacements = 0
+
+    def _find(self, key):
+        """
+        Returns the slot holding the key, or -1 if it is not in the table.
+        """
+        first = (hash(key) % self.buckets) * self.ways
+        keys = self._keys
+        for index in range(first, first + self.ways):
+            if keys[index] is not None and keys[index] == key:
+                return index
+        return -1
+
+    def _touch(self, index):
+        """
+        Marks a slot as just used.
+        """
+        self._clock += 1
+        self._used[index] = self._clock
+
+    def insert(self, key, value, depth=0):
+        """
+        Inserts a new key-value pair into the table. If the key already exists, the pair is not added.
+
+        Args:
+            key (Any): The key to be inserted into the table.
+            value (Any): The value associated with the key.
+            depth (int): How much work the value stands for, used by the 'depth' and 'two-tier' policies.
+
+        Returns:
+            bool: True if the pair was stored, False if the key already exists or the policy kept the old entry.
+
+        If the key's bucket is full, an entry is replaced (or the pair dropped) according to the policy.
+        """
+        if self._find(key) >= 0:
+            return False
+        first = (hash(key) % self.buckets) * self.ways
+        keys = self._keys
+        for index in range(first, first + self.ways):
+            if keys[index] is None:
+                self._store(index, key, value, depth)
+                self.size += 1
+                return True
+        self.collisions += 1
+        if self.policy == 'always':
+            index = first
+        elif self.policy == 'depth':
+            if depth < self._depths[first]:
+                return False
+            index = first
+        elif self.policy == 'two-tier':
+            index = first + 1
+            if depth >= self._depths[first]:
+                # The deep entry moves down to the always-replace tier
+                self._store(index, keys[first], self._values[first], self._depths[first])
+                index = first
+        else:
+            index = min(range(first, first + self.ways), key=self._used.__getitem__)
+        self._store(index, key, value, depth)
+        self.replacements += 1
+        return True
+
+    def _store(self, index, key, value, depth):
+        """
+        Writes an entry into a slot.
+        """
+        self._keys[index] = key
+        self._values[index] = value
+        self._depths[index] = depth
+        self._touch(index)
+
+    def modify(self, key, value, depth=0):
+        """
+        Modifies the value associated with an existing key in the table.
+
+        Args:
+            key (Any): The key whose value is to be modified.
+            value (Any): The new value to associate with the key.
+            depth (int): The depth of the new value.
+
+        Returns:
+            bool: True if the key was found and modified, False if the key was not found.
+        """
+        index = self._find(key)
+        if index < 0:
+            return False
+        self._values[index] = value
+        self._depths[index] = depth
+        self._touch(index)
+        return True
+
+    def remove(self, key):
+        """
+        Removes a key-value pair from the table.
+
+        Args:
+            key (Any): The key to be removed.
+
+        Returns:
+            bool: True if the key-value pair was successfully removed, False if the key was not found.
+        """
+        index = self._find(key)
+        if index < 0:
+            return False
+        self._keys[index] = None
+        self._values[index] = None
+        self._depths[index] = 0
+        self.size -= 1
+        return True
+
+    def search(self, key):
+        """
+        Searches for a key in the table and returns its associated value.
+
+        Args:
+            key (Any): The key to search for.
+
+        Returns:
+            Any: The value associated with the key if found, None if the key is not found or was replaced.
+        """
+        index = self._find(key)
+        if index < 0:
+            return None
+        if self.policy == 'lru':
+            self._touch(index)
+        return self._values[index]
+
+    def capacity(self):
+        """
+        Returns the fixed capacity of the table (the number of slots).
+
+        Returns:
+            int: The capacity of the table.
+        """
+        return self._capacity
+
+    def __len__(self):
+        """
+        Returns the number of elements currently stored in the hash table.
+
+        Returns:
+            int: The current number of elements in the table, never more than its capacity.
+        """
+        return self.size
+
+    def items(self):
+        """
+        Returns a lazy iterator over the (key, value) pairs in the table, in slot order.
+        Nothing is copied, so the table must not be changed while iterating.
+        """
+        for key, value in zip(self._keys, self._values):
+            if key is not None:
+                yield key, value
+
+    def memory_usage(self):
+        """
+        Estimates the memory the table uses, in bytes, like HashTable.memory_usage. It stays the
+        same once the table is full.
+
+        Returns:
+            dict: 'slots', 'keys', 'values', 'overhead' and 'total'.
+        """
+        stored = [index for index, key in enumerate(self._keys) if key is not None]
+        usage = {
+            'slots': sys.getsizeof(self._depths) + sys.getsizeof(self._used),
+            'keys': sys.getsizeof(self._keys) + sum(sys.getsizeof(self._keys[index]) for index in stored),
+            'values': sys.getsizeof(self._values) + sum(sys.getsizeof(self._values[index]) for index in stored),
+            'overhead': sys.getsizeof(self) + sys.getsizeof(self.__dict__),
+        }
+        usage['total'] = sum(usage.values())
+        return usage
@@ -2,11 +2,30 @@
 # Main Reviewer: Ahmed Kursi
 
 
-from a1_partd import get_overflow_list, overflow
-from a1_partc import Queue
+import time
+import multiprocessing
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+
+from a1_partd import get_overflow_list, run_overflow, grid_geometry
+from a2_parta import HashTable, RobinHoodHashTable, BoundedHashTable
+from zobrist import get_zobrist
+from flatboard import FlatBoard
+from position import Position
+from snapshot import write_snapshot
+from symmetry import map_move
+
+# NumPy is optional, without it evaluate_boards scores the boards one at a time
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 # This function duplicates and returns the board. You may find this useful
 def copy_board(board):
+        # A FlatBoard copies its single array in one step
+        if isinstance(board, FlatBoard):
+            return board.copy()
         # Initialize an empty list for the new board copy
         current_board = []
         height = len(board)
@@ -30,8 +49,9 @@ def evaluate_board(board, player):
         # Sum of player's cell values
     gem = 0
         
-    # Loop through each cell in the board    
-    for row in board:
+    # Loop through each cell in the board, a FlatBoard is scanned as one long row
+    rows = [board.cells] if isinstance(board, FlatBoard) else board
+    for row in rows:
         for cell in row:
                 # Ignore empty cells
             if cell != 0:
@@ -58,10 +78,263 @@ def evaluate_board(board, player):
     score = (gem * 100) // total
     return score
 
+# Returns the boards as one numpy array with a row of cells per board. Accepts a list of
+# boards in either format, or an array that is already stacked (boards x cells or boards x rows x cols)
+def stack_boards(boards):
+    if isinstance(boards, numpy.ndarray):
+        return boards.reshape(len(boards), -1)
+    if boards and isinstance(boards[0], FlatBoard):
+        cells = b''.join(board.cells.tobytes() for board in boards)
+        return numpy.frombuffer(cells, dtype=numpy.int8).reshape(len(boards), -1)
+    return numpy.array(boards, dtype=numpy.int8).reshape(len(boards), -1)
+
+# Scores many boards for the player in one vectorized pass, with the same win, loss and
+# draw rules as evaluate_board. Returns the scores as a list, in the order of the boards
+def evaluate_boards(boards, player):
+    if len(boards) == 0:
+        return []
+    if numpy is None:
+        return [evaluate_board(board, player) for board in boards]
+    cells = stack_boards(boards)
+    values = numpy.abs(cells)
+    total = values.sum(axis=1)
+    owned = cells > 0 if player == 1 else cells < 0
+    gem = (values * owned).sum(axis=1)
+    # Percentage of control, for the boards that are neither won nor lost
+    score = (gem * 100) // numpy.maximum(total, 1)
+    score = numpy.where(gem == 0, -100, score)
+    score = numpy.where(gem == total, 100, score)
+    return score.tolist()
+
+# Returns the cells the player is allowed to play, in row-major order
+def get_moves(board, player):
+    if isinstance(board, FlatBoard):
+        cols = board.cols
+        return [(index // cols, index % cols) for index, cell in enumerate(board.cells) if cell == 0 or cell * player > 0]
+    moves = []
+    for i in range(len(board)):
+        for j in range(len(board[0])):
+            # A cell is playable if it is empty or already owned by the player
+            if board[i][j] == 0 or board[i][j] * player > 0:
+                moves.append((i, j))
+    return moves
+
+# Returns a new board with the player's move applied and any overflow resolved
+def apply_move(board, move, player):
+    (i, j) = move
+    # Create a copy of the board with the player's move
+    new_board = copy_board(board)
+    new_board[i][j] += player
+    # Check for overflow and apply it if necessary, only the final board is needed
+    if get_overflow_list(new_board):
+        run_overflow(new_board, None)
+    return new_board
+
+# Same as apply_move, but also returns the Zobrist key of the new position (opponent to move).
+# The key is updated only for the played cell and the cells the overflow cascade changed.
+# With an OverflowCache, a cascade already resolved in the same position is replayed from it
+def apply_move_hashed(board, key, move, player, cache = None):
+    (i, j) = move
+    zobrist = get_zobrist(len(board), len(board[0]))
+    new_board = copy_board(board)
+    # A FlatBoard is read and written through its flat cells, without row views
+    if isinstance(new_board, FlatBoard):
+        cols = new_board.cols
+        cells = new_board.cells
+        touched = {(i, j): cells[i * cols + j]}
+        cells[i * cols + j] += player
+    else:
+        cols = len(new_board[0])
+        cells = None
+        touched = {(i, j): new_board[i][j]}
+        new_board[i][j] += player
+    if get_overflow_list(new_board):
+        entry = cache.lookup(key, i * cols + j) if cache is not None else None
+        if entry is not None:
+            for changed, value in zip(entry[0], entry[1]):
+                (r, c) = divmod(changed, cols)
+                if (r, c) not in touched:
+                    touched[(r, c)] = cells[changed] if cells is not None else new_board[r][c]
+                if cells is not None:
+                    cells[changed] = value
+                else:
+                    new_board[r][c] = value
+        else:
+            steps = run_overflow(new_board, None, touched)
+            if cache is not None and steps >= cache.min_steps:
+                changed_cells = [r * cols + c for (r, c) in touched]
+                values = [cells[changed] if cells is not None else new_board[changed // cols][changed % cols] for changed in changed_cells]
+                cache.store(key, i * cols + j, changed_cells, values, steps)
+    for (r, c), old in touched.items():
+        new = cells[r * cols + c] if cells is not None else new_board[r][c]
+        if new != old:
+            key = zobrist.update(key, r, c, old, new)
+    return new_board, zobrist.toggle_side(key)
+
+# Kinds of score stored in the transposition table: the exact value, or only a lower/upper bound of it
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# Returns the Zobrist key a position is stored under: the board and the player to move
+def position_key(board, player):
+    return get_zobrist(len(board), len(board[0])).key_of(board, player)
+
+# Remembers positions the search has already scored, so a position reached again
+# through another move order (or another overflow cascade) is not searched twice.
+# The scores are from the searching player's point of view, so a table should only
+# be shared between searches for the same player. A symmetric GameTree stores
+# positions under their canonical key, so mirrored positions share one entry
+class TranspositionTable:
+    def __init__(self, cap = 1024, compact = False, policy = None, snapshot = None):
+        # Entries are (depth, score, flag, best move) tuples stored in our own hash table.
+        # A compact table packs each entry into one 64-bit integer next to its 64-bit key,
+        # about 40 bytes per position instead of about 240
+        self.compact = compact
+        # With a replacement policy (see BoundedHashTable) the table keeps cap entries at
+        # most and replaces old ones, so it can be kept for a whole tournament
+        self.bounded = policy is not None
+        if self.bounded:
+            self.table = BoundedHashTable(cap, policy)
+        elif compact:
+            self.table = RobinHoodHashTable(cap, key_type = 'Q', value_type = 'q')
+        else:
+            self.table = HashTable(cap)
+        # Optional read-only SnapshotTable of entries searched offline, see save(). It is
+        # probed for positions the table itself does not have
+        self.snapshot = snapshot
+        # Number of probes that found / did not find the position
+        self.hits = 0
+        self.misses = 0
+        # Number of hits whose score was used without searching the position again
+        self.cutoffs = 0
+
+    # Returns the entry stored for the key, or None
+    def probe(self, key):
+        entry = self.table.search(key)
+        if entry is None and self.snapshot is not None:
+            entry = self.snapshot.search(key)
+            if entry is not None and not self.compact:
+                entry = unpack_entry(entry)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            if self.compact:
+                entry = unpack_entry(entry)
+        return entry
+
+    # Stores the result of searching a position depth plies deep, replacing older results
+    def store(self, key, depth, score, flag, move):
+        entry = pack_entry(depth, score, flag, move) if self.compact else (depth, score, flag, move)
+        if self.bounded:
+            if not self.table.modify(key, entry, depth):
+                self.table.insert(key, entry, depth)
+        elif not self.table.modify(key, entry):
+            self.table.insert(key, entry)
+
+    # Fraction of probes that found the position
+    def hit_rate(self):
+        probes = self.hits + self.misses
+        return self.hits / probes if probes else 0.0
+
+    # Writes the entries to a snapshot file (see snapshot.py), each packed in 8 bytes, so
+    # a table searched offline can be opened by the bots with SnapshotTable(path)
+    def save(self, path):
+        entries = ((key, entry if self.compact else pack_entry(*entry)) for key, entry in self.table.items())
+        return write_snapshot(entries, path, 'q', count = len(self.table))
+
+    # Estimated bytes used by the stored entries, see HashTable.memory_usage
+    def memory_usage(self):
+        return self.table.memory_usage()
+
+    def __len__(self):
+        return len(self.table)
+
+# Packs a transposition table entry into one integer: 8 bits of depth, 2 of flag, 16 of
+# score (searches only store integer scores) and the move as 1 + row * 256 + col, 0 for None
+def pack_entry(depth, score, flag, move):
+    packed_move = 0 if move is None else 1 + move[0] * 256 + move[1]
+    return depth | flag << 8 | (score + 32768) << 10 | packed_move << 26
+
+# Returns the (depth, score, flag, move) entry packed by pack_entry
+def unpack_entry(packed):
+    packed_move = packed >> 26
+    move = None if packed_move == 0 else divmod(packed_move - 1, 256)
+    return (packed & 0xFF, ((packed >> 10) & 0xFFFF) - 32768, (packed >> 8) & 3, move)
+
+# Decides in which order the alpha-beta search tries the moves of a position. Good
+# moves first means more cutoffs, the order is:
+#   1. the best move the transposition table remembers for the position
+#   2. killer moves: moves that caused a cutoff at the same depth in a sibling position
+#   3. the rest, ranked by the history table (how much cutoff work each cell has caused)
+#      and then by how close the cell is to overflowing
+# One ordering is shared by all the searches of an IterativeDeepening, so the killers
+# and the history learned by the shallow iterations order the deeper ones
+class MoveOrdering:
+    def __init__(self, killers_per_depth = 2):
+        self.killers_per_depth = killers_per_depth
+        # depth -> most recent killer moves at that depth
+        self.killers = {}
+        # move -> history score
+        self.history = {}
+        # Number of cutoffs, and how many of them came from the first move tried
+        self.cutoffs = 0
+        self.first_cutoffs = 0
+
+    # Returns the moves in the order they should be searched
+    def order(self, board, moves, player, depth, tt_move = None):
+        killers = self.killers.get(depth, [])
+        geometry = grid_geometry(board)
+        cols = geometry.cols
+        cells = board.cells if isinstance(board, FlatBoard) else [cell for row in board for cell in row]
+
+        def rank(move):
+            if move == tt_move:
+                return (0, 0, 0)
+            if move in killers:
+                return (1, killers.index(move), 0)
+            (row, col) = move
+            # A cell one piece away from overflowing starts a cascade when played
+            about_to_overflow = abs(cells[row * cols + col]) == geometry.thresholds[row * cols + col] - 1
+            return (2, -self.history.get(move, 0), 0 if about_to_overflow else 1)
+
+        # sorted() is stable, so equally ranked moves stay in row-major order
+        return sorted(moves, key=rank)
+
+    # Called by the search when move made the position at depth fail high or low
+    def record_cutoff(self, move, depth, remaining, index):
+        self.cutoffs += 1
+        if index == 0:
+            self.first_cutoffs += 1
+        killers = self.killers.setdefault(depth, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[self.killers_per_depth:]
+        # Cutoffs close to the root save the most work
+        self.history[move] = self.history.get(move, 0) + remaining * remaining
+
+    # Called when the root of the search moves plies deeper into the tree it learned from:
+    # killers move up with their positions and old history counts for half as much
+    def advance(self, plies):
+        self.killers = {depth - plies: killers for depth, killers in self.killers.items() if depth >= plies}
+        for move in self.history:
+            self.history[move] //= 2
+
+    # Fraction of cutoffs caused by the first move tried, the closer to 1 the better the ordering
+    def first_cutoff_rate(self):
+        return self.first_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+# Raised inside a search when its time or node budget has run out
+class SearchTimeout(Exception):
+    pass
+
 class Node:
     def __init__(self, board, depth, player, tree_height = 4):
-        # A node should have a board representing the game at the time of the move is done
-        self.board = board
+        # A node should have a board representing the game at the time of the move is done.
+        # It is kept as a compact FlatBoard, so the leaves of a tree can be scored in one batch,
+        # and read back through the board property in the list-of-lists format
+        self.flat = board if isinstance(board, FlatBoard) else FlatBoard.from_lists(board)
         # Depth is to determine where it is min's or max's turn at the point where node reached
         self.depth = depth
         # Player is who played the node
@@ -72,20 +345,63 @@ class Node:
         self.score = None
         # The move of the player at the time node is played
         self.move = None
+        # Zobrist key of the board with this node's player to move
+        self.key = None
+        # List-of-lists copy of flat, built on the first read of board
+        self.lists = None
+
+    # The node's board as a list of rows. It is read-only: the list is a copy of the FlatBoard
+    # the tree works on, built once and cached, so changing it does not change the tree.
+    # Assigning a new board raises AttributeError, a node's board is changed through flat
+    @property
+    def board(self):
+        if self.lists is None:
+            self.lists = self.flat.to_lists()
+        return self.lists
             
 # Game Tree class
 class GameTree:
-    def __init__(self, board, player, tree_height = 4):
+    def __init__(self, board, player, tree_height = 4, alpha_beta = False, deadline = None, node_limit = None, table = None, ordering = None, in_place = True, symmetric = False, cache = None, stop = None):
         # Store the starting player
         self.player = player
         # Create a copy of the initial board
         self.board = copy_board(board)
         # Initialize the root node with the starting board and player
         self.root = Node(board, 0, player)
+        self.root.key = position_key(self.root.flat, player)
         # Set the height of the game tree
         self.tree_height = tree_height
+        # Alpha-beta mode generates children lazily inside get_move, so only plain minimax needs the full tree
+        self.alpha_beta = alpha_beta
+        # Optional budget for the alpha-beta search: a time.perf_counter() deadline and a maximum number of nodes
+        self.deadline = deadline
+        self.node_limit = node_limit
+        # Optional threading.Event another thread sets to end the search, like running out of time
+        self.stop = stop
+        # Number of positions the alpha-beta search has visited
+        self.nodes = 0
+        # Optional TranspositionTable shared with other searches for the same player
+        self.table = table
+        # Optional MoveOrdering deciding in which order the alpha-beta search tries moves
+        self.ordering = ordering
+        # The alpha-beta search plays and undoes moves on one shared Position instead of
+        # copying it for every child, so it only keeps the line being searched in memory
+        self.in_place = in_place
+        # The transposition table looks positions up by their canonical key (symmetry.canonical
+        # without a colour swap), so a position and its mirror images share one entry
+        self.symmetric = symmetric
+        # Optional OverflowCache of resolved cascades shared with other searches
+        self.cache = cache
+        # Best root score of a parallel search, shared with the other workers, and the pool
+        # of worker processes get_move_parallel keeps between calls
+        self.shared_alpha = None
+        self.executor = None
+        self.workers = None
+        # Shuts the pool down when the tree is dropped without close_parallel
+        self.finalizer = None
         # Build the game tree up to the specified height
-        self.build_tree(self.root, tree_height)
+        if not alpha_beta:
+            self.build_tree(self.root, tree_height)
             
     # Builds the game tree up to the specified height
     def build_tree(self, node, height):
@@ -94,33 +410,25 @@ class GameTree:
             return
 
         # Traverse the board to find playable moves
-        for i in range(len(node.board)):
-            for j in range(len(node.board[0])):
-                # If the cell is playable for the current player
-                if node.board[i][j] == 0 or node.board[i][j] * node.player > 0:
-                    # Create a copy of the board with the player's move
-                    new_board = copy_board(node.board)
-                    new_board[i][j] += node.player
-                    # Check for overflow and apply it if necessary
-                    if get_overflow_list(new_board):
-                            a_queue = Queue()
-                            a_queue.enqueue(new_board)
-                            overflow(new_board, a_queue)
-                            new_board = a_queue.dequeue()
-                     # Create a child node for the opponent's turn
-                    child_node = Node(new_board, node.depth + 1, -node.player)
-                    # Record the move that generated this child node
-                    child_node.move = (i, j)
-                    # Add the child node to the current node's children
-                    node.children.append(child_node)
-                    # Recursively build the tree for the child node
-                    self.build_tree(child_node, height - 1)
+        for move in get_moves(node.flat, node.player):
+            new_board, new_key = apply_move_hashed(node.flat, node.key, move, node.player, self.cache)
+            # Create a child node for the opponent's turn
+            child_node = Node(new_board, node.depth + 1, -node.player)
+            child_node.key = new_key
+            # Record the move that generated this child node
+            child_node.move = move
+            # Add the child node to the current node's children
+            node.children.append(child_node)
+            # Recursively build the tree for the child node
+            self.build_tree(child_node, height - 1)
 
     # Minimax function to evaluate the best score for the player
     def minimax(self, node):
         # If no children, evaluate and set the score for this node
         if not node.children:
-            node.score = evaluate_board(node.board, node.player)
+            # Leaves are always scored for the player the tree is searching for, so odd heights work too
+            if node.score is None:
+                node.score = evaluate_board(node.flat, self.player)
             return node.score
         # Maximizer's turn (player's turn at even depths)
         if node.depth % 2 == 0:  
@@ -132,8 +440,139 @@ class GameTree:
             # Choose the minimum score from child nodes
             node.score = min(self.minimax(child) for child in node.children)
             return node.score
+
+    # Alpha-beta search over positions generated on demand. It scores every position
+    # exactly like minimax does on the full tree, but stops looking at the remaining
+    # children of a node once they can no longer change the result at the root.
+    # Positions keep their own piece totals, so leaves are scored in O(1)
+    def alphabeta(self, position, depth, alpha, beta):
+        # Give up on the whole search as soon as the budget is spent
+        self.nodes += 1
+        if self.node_limit is not None and self.nodes > self.node_limit:
+            raise SearchTimeout()
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+        if self.stop is not None and self.stop.is_set():
+            raise SearchTimeout()
+        # In a parallel worker, a better root move found by another worker raises alpha for
+        # the rest of this search too. One below, so a move that ties it is still scored exactly
+        if self.shared_alpha is not None:
+            alpha = max(alpha, self.shared_alpha.value - 1)
+        # Leaves are the same as in build_tree: the height limit or a board with no playable cell
+        board = position.board
+        player = position.player
+        moves = get_moves(board, player) if depth < self.tree_height else []
+        if not moves:
+            return position.evaluate(self.player)
+        remaining = self.tree_height - depth
+        tt_move = None
+        # A position already searched at least this deep can answer for this node
+        if self.table is not None:
+            (key, transform) = self.table_key(position)
+            entry = self.table.probe(key)
+            if entry is not None:
+                (entry_depth, score, flag, entry_move) = entry
+                if entry_depth >= remaining:
+                    if flag == EXACT or (flag == LOWER and score >= beta) or (flag == UPPER and score <= alpha):
+                        self.table.cutoffs += 1
+                        return score
+                tt_move = self.table_move(entry_move, transform)
+        # The stored best move is the most likely to cause a cutoff, so it goes first
+        if self.ordering is not None:
+            moves = self.ordering.order(board, moves, player, depth, tt_move)
+        elif tt_move in moves:
+            moves.remove(tt_move)
+            moves.insert(0, tt_move)
+        alpha_start = alpha
+        beta_start = beta
+        best_move = None
+        # Maximizer's turn (player's turn at even depths)
+        if depth % 2 == 0:
+            value = float('-inf')
+            for index, move in enumerate(moves):
+                score = self.search_child(position, move, depth + 1, alpha, beta)
+                if score > value:
+                    value = score
+                    best_move = move
+                # The minimizer above will never let the game reach this node
+                if value >= beta:
+                    if self.ordering is not None:
+                        self.ordering.record_cutoff(move, depth, remaining, index)
+                    break
+                alpha = max(alpha, value)
+        # Minimizer's turn (opponent's turn at odd depths)
+        else:
+            value = float('inf')
+            for index, move in enumerate(moves):
+                score = self.search_child(position, move, depth + 1, alpha, beta)
+                if score < value:
+                    value = score
+                    best_move = move
+                # The maximizer above already has a better option
+                if value <= alpha:
+                    if self.ordering is not None:
+                        self.ordering.record_cutoff(move, depth, remaining, index)
+                    break
+                beta = min(beta, value)
+        if self.table is not None:
+            # Record whether the value is exact or only a bound of the real one
+            if value <= alpha_start:
+                flag = UPPER
+            elif value >= beta_start:
+                flag = LOWER
+            else:
+                flag = EXACT
+            self.table.store(key, remaining, value, flag, self.table_move(best_move, transform))
+        return value
+
+    # Returns (key, transform) the transposition table stores the position under
+    def table_key(self, position):
+        if self.symmetric:
+            return position.canonical_key(swap_colors = False)
+        return position.key, None
+
+    # Maps a move between the position and the canonical one it is stored as. Every
+    # transform is its own inverse, so the same call works in both directions
+    def table_move(self, move, transform):
+        if transform is None or move is None:
+            return move
+        return map_move(move, transform, self.root.flat.rows, self.root.flat.cols)
+
+    # Scores every leaf of the built tree with one evaluate_boards call, so minimax
+    # only has to combine the scores instead of evaluating the leaves one by one.
+    # Only the full-tree minimax uses it. The alpha-beta search the bots run never builds
+    # its frontier, and scores each leaf in O(1) from the Position totals instead
+    def score_leaves(self):
+        leaves = []
+        nodes = [self.root]
+        while nodes:
+            node = nodes.pop()
+            if node.children:
+                nodes.extend(node.children)
+            else:
+                leaves.append(node)
+        scores = evaluate_boards([leaf.flat for leaf in leaves], self.player)
+        for leaf, score in zip(leaves, scores):
+            leaf.score = score
+
+    # Searches the position reached by playing move. In place, the move is played on the
+    # position itself and taken back afterwards (if the budget runs out halfway the
+    # position is left changed, but the whole search is abandoned then anyway)
+    def search_child(self, position, move, depth, alpha, beta):
+        if self.in_place:
+            position.play(move)
+            score = self.alphabeta(position, depth, alpha, beta)
+            position.undo()
+            return score
+        child = position.copy()
+        child.play(move)
+        return self.alphabeta(child, depth, alpha, beta)
+
     # Returns the best move for the player based on Minimax
     def get_move(self):
+        if self.alpha_beta:
+            return self.get_move_alphabeta()
+        self.score_leaves()
         best_score = float('-inf')
         best_move = None
         # Search and find the best move in children with minimax algorithm
@@ -143,7 +582,85 @@ class GameTree:
                 best_score = score
                 best_move = child.move
         return best_move
-   
+
+    # Returns the same move as get_move on the full tree. Each root move is searched
+    # with the best score so far as alpha, so a move that only ties the best one is
+    # cut off early and the first best move in row-major order is kept. When the
+    # moves are reordered, a move that comes before the best one in row-major order
+    # is searched with alpha one below the best score (scores are integers), so a tie
+    # is still seen exactly and resolved the same way
+    def get_move_alphabeta(self):
+        best_score = float('-inf')
+        best_move = None
+        best_index = None
+        position = Position(self.root.flat, self.player, symmetric = self.symmetric, cache = self.cache)
+        board = position.board
+        (key, transform) = self.table_key(position)
+        moves = get_moves(board, self.player) if self.tree_height > 0 else []
+        # Row-major position of every move, used to break ties like minimax does
+        order = {move: index for index, move in enumerate(moves)}
+        if self.ordering is not None and moves:
+            tt_move = None
+            if self.table is not None:
+                entry = self.table.probe(key)
+                if entry is not None:
+                    tt_move = self.table_move(entry[3], transform)
+            moves = self.ordering.order(board, moves, self.player, 0, tt_move)
+        for move in moves:
+            alpha = best_score
+            if best_index is not None and order[move] < best_index:
+                alpha = best_score - 1
+            score = self.search_child(position, move, 1, alpha, float('inf'))
+            if score > best_score or (score == best_score and order[move] < best_index):
+                best_score = score
+                best_move = move
+                best_index = order[move]
+        if self.table is not None and best_move is not None:
+            self.table.store(key, self.tree_height, best_score, EXACT, self.table_move(best_move, transform))
+        return best_move
+
+    # Returns the same move as get_move, but searches the root moves in parallel on a
+    # pool of worker processes (workers=None uses one per CPU). The workers share the
+    # best root score found so far and tighten their alpha bound with it at every node.
+    # The pool is started on the first call and kept for the next ones, close_parallel (or
+    # leaving a with block on the tree) ends it
+    def get_move_parallel(self, workers = None):
+        moves = get_moves(self.board, self.player) if self.tree_height > 0 else []
+        if not moves:
+            return None
+        if self.executor is None or self.workers != workers:
+            self.close_parallel()
+            self.shared_alpha = multiprocessing.Value('d', float('-inf'))
+            self.executor = ProcessPoolExecutor(max_workers = workers, initializer = _init_parallel_worker, initargs = (self.shared_alpha,))
+            self.workers = workers
+            self.finalizer = weakref.finalize(self, self.executor.shutdown)
+        self.shared_alpha.value = float('-inf')
+        futures = [self.executor.submit(_search_root_move, self.board, self.player, self.tree_height, move) for move in moves]
+        results = [future.result() for future in futures]
+        # Merge in row-major order, so the first best move wins no matter which worker finished first
+        best_score = float('-inf')
+        best_move = None
+        for move, (score, nodes) in zip(moves, results):
+            self.nodes += nodes
+            if score > best_score:
+                best_score = score
+                best_move = move
+        return best_move
+
+    # Shuts down the worker processes of get_move_parallel, if any. A tree used in a with
+    # block does it on leaving the block, a dropped tree when it is garbage collected
+    def close_parallel(self):
+        if self.executor is not None:
+            self.finalizer()
+            self.executor = None
+            self.finalizer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close_parallel()
+
     # This function clears the nodes in the tree one by one
     def clear_tree(self):
          self.delete_nodes(self.root)
@@ -156,3 +673,133 @@ class GameTree:
         for child in node.children:
             self.delete_nodes(child)
         del node
+
+# Best root score found so far by a parallel search, shared by all its worker processes
+_shared_alpha = None
+
+# Runs once in every worker process of get_move_parallel
+def _init_parallel_worker(shared_alpha):
+    global _shared_alpha
+    _shared_alpha = shared_alpha
+
+# Searches one root move in a worker process and returns (score, nodes searched).
+# The alpha bound is one below the best score shared by the other workers, read again at
+# every node: a move that ties the best is still scored exactly, so the merged result does
+# not depend on which worker got there first. A worse move may come back as an upper bound
+# only. The workers have no transposition table, whose bounds the changing alpha would spoil
+def _search_root_move(board, player, tree_height, move):
+    tree = GameTree(board, player, tree_height, alpha_beta = True, ordering = MoveOrdering())
+    tree.shared_alpha = _shared_alpha.get_obj()
+    position = Position(board, player)
+    position.play(move)
+    score = tree.alphabeta(position, 1, float('-inf'), float('inf'))
+    with _shared_alpha.get_lock():
+        if score > _shared_alpha.value:
+            _shared_alpha.value = score
+    return score, tree.nodes
+
+# Searches depth 1, 2, 3... with alpha-beta and keeps the move of the deepest search that finished.
+# The search stops at max_depth or when the time budget (in seconds) or node budget runs out.
+# One object can search every move of a game: the table then still holds the subtree of
+# the last search, so when the new position was searched there (as the reply to the move
+# played) the search resumes at the depth it was searched to instead of starting at 1
+class IterativeDeepening:
+    def __init__(self, player, time_limit = 1.0, node_limit = None, max_depth = 6, symmetric = False, cache = None, table = None):
+        # The player the search picks moves for
+        self.player = player
+        # Budget for a single get_move call, None means unlimited
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        # Deepest height that will be searched
+        self.max_depth = max_depth
+        # Whether mirrored positions share transposition table entries. It pays off near
+        # the symmetric starting position, later the extra keys mostly cost time
+        self.symmetric = symmetric
+        # Optional OverflowCache kept across iterations and moves
+        self.cache = cache
+        # Statistics of the last get_move call, reused_depth is the depth the last search
+        # found already done in the table
+        self.completed_depth = 0
+        self.nodes = 0
+        self.reused_depth = 0
+        # Results of the shallower iterations are kept for the deeper ones, and for the
+        # following moves. A bounded table keeps the memory flat over a long game
+        self.table = table if table is not None else TranspositionTable()
+        self.ordering = MoveOrdering()
+        # Optional threading.Event that ends get_move early from another thread, with the
+        # move of the deepest search finished so far
+        self.stop = None
+        # Position the last search started from
+        self.root = None
+
+    # Returns whether position follows the root of the last search by one move of the
+    # player and one reply, so what the search learned there is two plies deeper now
+    def follows_root(self, position):
+        if self.root is None:
+            return False
+        root = self.root
+        for move in get_moves(root.board, self.player):
+            root.play(move)
+            for reply in get_moves(root.board, root.player):
+                root.play(reply)
+                found = root.key == position.key
+                root.undo()
+                if found:
+                    root.undo()
+                    return True
+            root.undo()
+        return False
+
+    def get_move(self, board):
+        deadline = None
+        if self.time_limit is not None:
+            deadline = time.perf_counter() + self.time_limit
+        self.completed_depth = 0
+        self.nodes = 0
+        best_move = None
+        first_height = 1
+        # Results the table still has for this position: its depth and best move stand for
+        # the shallower iterations, which do not need to be searched again. Only an exact
+        # entry holds the best move, a bound only says its move beat the window, and the
+        # search still tries that move first through the table
+        position = Position(board, self.player, symmetric = self.symmetric)
+        (key, transform) = position.canonical_key(swap_colors = False) if self.symmetric else (position.key, None)
+        entry = self.table.probe(key)
+        self.reused_depth = 0
+        if entry is not None and entry[2] == EXACT and entry[3] is not None and entry[0] > 0:
+            move = entry[3]
+            if transform is not None:
+                move = map_move(move, transform, len(board), len(board[0]))
+            if move in get_moves(board, self.player):
+                self.reused_depth = min(entry[0], self.max_depth)
+                self.completed_depth = self.reused_depth
+                best_move = move
+                first_height = min(self.reused_depth + 1, self.max_depth)
+        # The root moved down the tree of the last search, by our move and the reply:
+        # the killers move up with their positions
+        if self.follows_root(position):
+            self.ordering.advance(2)
+        self.root = position
+        for height in range(first_height, self.max_depth + 1):
+            node_limit = None
+            if self.node_limit is not None:
+                node_limit = self.node_limit - self.nodes
+            tree = GameTree(board, self.player, height, alpha_beta = True, deadline = deadline, node_limit = node_limit, table = self.table, ordering = self.ordering, symmetric = self.symmetric, cache = self.cache, stop = self.stop)
+            try:
+                move = tree.get_move()
+            except SearchTimeout:
+                # The unfinished depth is thrown away, the previous one stands
+                break
+            finally:
+                self.nodes += tree.nodes
+            best_move = move
+            self.completed_depth = height
+            # Nothing can be played, so searching deeper will not help
+            if move is None:
+                break
+        # Not even depth 1 finished in time, any playable cell is better than no move
+        if best_move is None:
+            moves = get_moves(board, self.player)
+            if moves:
+                best_move = moves[0]
+        return best_move
@@ -0,0 +1,281 @@
+#    Main Author(s): Ahmed Kursi
+#    Main Reviewer(s): Ahmed Kursi
+#
+#   Benchmarks for the search engine and the data structures it uses.
+#   To use this, run: python benchmark.py <benchmark> [options]
+#   e.g. python benchmark.py parallel --height 5 --workers 1 2 4 8 16
+#        python benchmark.py overflow --sizes 8 16 32 64
+#        python benchmark.py cache --height 4
+#        python benchmark.py hashtable --sizes 1000 100000 10000000
+#        python benchmark.py latency --entries 1000000
+#        python benchmark.py replacement --entries 2048
+#        python benchmark.py ponder --time 0.3 --think 0.3
+
+import argparse
+import gc
+import os
+import random
+import time
+
+from a1_partc import Queue
+from a1_partd import overflow_worklist, overflow_numpy, get_geometry, numpy
+from a2_parta import HashTable, RobinHoodHashTable
+from a2_partb import GameTree, TranspositionTable, MoveOrdering, IterativeDeepening, apply_move
+from book import start_board
+from overflow_cache import OverflowCache
+from ponder import Ponderer
+from position import Position
+
+# A 5x6 position from the middle of a game, used by the search benchmarks
+MIDGAME_BOARD = [
+    [ 1,  0,  0,  0,  0,  0],
+    [ 0,  2, -1,  0,  0,  0],
+    [ 0, -2,  3,  0,  1,  0],
+    [ 0, -1,  0,  0, -2,  0],
+    [ 0,  0,  0,  0,  0, -1]
+]
+
+# Returns the best of repeat wall-clock timings of a call, in seconds
+def best_time(function, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+# Time of a parallel root search for each worker count, compared to one worker
+def bench_parallel(args):
+    print(f"parallel root search, height {args.height}, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'seconds':>10} {'speedup':>8} {'nodes':>8}  move")
+    serial = GameTree(MIDGAME_BOARD, 1, args.height, alpha_beta = True)
+    result = []
+    base = best_time(lambda: result.append(serial.get_move()), args.repeat)
+    print(f"{'serial':>8} {base:>10.3f} {1:>8.2f} {serial.nodes // args.repeat:>8}  {result[-1]}")
+    for workers in args.workers:
+        with GameTree(MIDGAME_BOARD, 1, args.height, alpha_beta = True) as tree:
+            # The first call starts the pool, the timed ones reuse it
+            tree.get_move_parallel(workers)
+            tree.nodes = 0
+            seconds = best_time(lambda: result.append(tree.get_move_parallel(workers)), args.repeat)
+        print(f"{workers:>8} {seconds:>10.3f} {base / seconds:>8.2f} {tree.nodes // args.repeat:>8}  {result[-1]}")
+
+# Gives up on cascades that never end, so they can be left out of the timings
+class BoundedQueue(Queue):
+    def enqueue(self, data):
+        if len(self) > 300:
+            raise RuntimeError('cascade does not end')
+        super().enqueue(data)
+
+# Returns up to count dense n x n boards: every cell one piece short of overflowing
+# and some already over, so most of the grid overflows in every wave. Boards whose
+# cascade never ends are skipped
+def cascade_boards(n, count, generator, attempts=40):
+    geometry = get_geometry(n, n)
+    boards = []
+    for _ in range(attempts):
+        board = [[0] * n for _ in range(n)]
+        for index in range(geometry.size):
+            row, col = divmod(index, n)
+            pieces = geometry.thresholds[index] - 1 + (generator.random() < 0.05)
+            board[row][col] = pieces * generator.choice((1, 1, 1, -1))
+        try:
+            overflow_worklist([row[:] for row in board], BoundedQueue())
+        except RuntimeError:
+            continue
+        boards.append(board)
+        if len(boards) == count:
+            break
+    return boards
+
+# Time to resolve the same cascades with the scalar and the NumPy engine as the grid grows
+def bench_overflow(args):
+    if numpy is None:
+        print("NumPy is not installed, only the scalar engine can run")
+        return
+    generator = random.Random(1)
+    print(f"{'grid':>8} {'cascades':>9} {'python s':>10} {'numpy s':>10} {'speedup':>8}")
+    for n in args.sizes:
+        boards = cascade_boards(n, args.boards, generator)
+        if not boards:
+            continue
+        times = []
+        for engine in (overflow_worklist, overflow_numpy):
+            times.append(best_time(lambda: [engine([row[:] for row in board], None) for board in boards], args.repeat))
+        print(f"{n:>4}x{n:<3} {len(boards):>9} {times[0]:>10.4f} {times[1]:>10.4f} {times[0] / times[1]:>8.2f}")
+
+# Time of a full minimax tree with and without an overflow cache, for each shortest cached cascade
+def bench_cache(args):
+    print(f"minimax tree of height {args.height} on the midgame board")
+    print(f"{'cache':>12} {'seconds':>10} {'hit rate':>9} {'entries':>8} {'KiB':>8} {'evicted':>8}")
+    for min_steps in [None] + args.min_steps:
+        caches = []
+        def search():
+            cache = OverflowCache(args.entries, min_steps = min_steps) if min_steps is not None else None
+            caches.append(cache)
+            GameTree(MIDGAME_BOARD, 1, args.height, cache = cache).get_move()
+        seconds = best_time(search, args.repeat)
+        cache = caches[-1]
+        if cache is None:
+            print(f"{'none':>12} {seconds:>10.3f}")
+        else:
+            label = f"{min_steps}+ waves"
+            print(f"{label:>12} {seconds:>10.3f} {cache.hit_rate():>9.3f} {len(cache):>8} {cache.bytes / 1024:>8.0f} {cache.evictions:>8}")
+
+# Nanoseconds per operation of each table implementation as it grows, with 64-bit
+# random keys like the Zobrist keys the transposition table uses
+def bench_hashtable(args):
+    tables = {"chaining": HashTable, "robin hood": RobinHoodHashTable,
+              "typed rh": lambda: RobinHoodHashTable(key_type = 'Q', value_type = 'Q')}
+    print(f"{'entries':>9} {'table':>11} {'insert':>8} {'hit':>8} {'miss':>8} {'remove':>8}  (ns per operation) {'bytes':>6} per entry")
+    generator = random.Random(1)
+    for n in args.sizes:
+        keys = [generator.getrandbits(64) for _ in range(n)]
+        missing = [generator.getrandbits(64) for _ in range(n)]
+        for name, table_class in tables.items():
+            table = table_class()
+            costs = []
+            start = time.perf_counter()
+            for key in keys:
+                table.insert(key, key)
+            costs.append(time.perf_counter() - start)
+            usage = table.memory_usage()['total'] / n
+            for operation, batch in ((table.search, keys), (table.search, missing), (table.remove, keys)):
+                start = time.perf_counter()
+                for key in batch:
+                    operation(key)
+                costs.append(time.perf_counter() - start)
+            costs = [cost * 1e9 / n for cost in costs]
+            print(f"{n:>9} {name:>11} " + " ".join(f"{cost:>8.0f}" for cost in costs) + f" {usage:>25.0f}")
+
+# Latency of single inserts while a table grows to the given size, resizing all at
+# once or incrementally. The slowest inserts are the ones that trigger a resize
+def bench_latency(args):
+    generator = random.Random(1)
+    keys = [generator.getrandbits(64) for _ in range(args.entries)]
+    print(f"{args.entries} inserts, latency in microseconds")
+    print(f"{'resize':>12} {'p50':>8} {'p99':>8} {'max':>10} {'total s':>8}")
+    clock = time.perf_counter_ns
+    # Full collections of the millions of entry tuples would show up as latency spikes of
+    # their own, so the collector is paused to time the tables alone
+    gc.disable()
+    for incremental in (False, True):
+        table = HashTable(incremental = incremental)
+        latencies = []
+        for key in keys:
+            start = clock()
+            table.insert(key, key)
+            latencies.append(clock() - start)
+        total = sum(latencies) / 1e9
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2] / 1000
+        p99 = latencies[len(latencies) * 99 // 100] / 1000
+        label = "incremental" if incremental else "all at once"
+        print(f"{label:>12} {p50:>8.2f} {p99:>8.2f} {latencies[-1] / 1000:>10.0f} {total:>8.2f}")
+        del table
+        gc.collect()
+    gc.enable()
+
+# Iterative deepening on the midgame board with a transposition table that can hold
+# only so many entries, for each replacement policy, against an unbounded table
+def bench_replacement(args):
+    print(f"iterative deepening to height {args.height}, {args.entries} entries at most")
+    print(f"{'policy':>10} {'seconds':>8} {'nodes':>8} {'hit rate':>9} {'entries':>8} {'collisions':>11} {'replaced':>9}")
+    for policy in [None, 'always', 'depth', 'two-tier', 'lru']:
+        table = TranspositionTable(args.entries, policy = policy)
+        ordering = MoveOrdering()
+        nodes = 0
+        start = time.perf_counter()
+        for height in range(1, args.height + 1):
+            tree = GameTree(MIDGAME_BOARD, 1, height, alpha_beta = True, table = table, ordering = ordering)
+            tree.get_move()
+            nodes += tree.nodes
+        seconds = time.perf_counter() - start
+        line = f"{policy or 'unbounded':>10} {seconds:>8.2f} {nodes:>8} {table.hit_rate():>9.3f} {len(table):>8}"
+        if policy is not None:
+            line += f" {table.table.collisions:>11} {table.table.replacements:>9}"
+        print(line)
+
+# Depth the bot reaches on each move of a game against a fixed-depth opponent that
+# thinks for args.think more seconds, as a human would, with and without pondering
+def bench_ponder(args):
+    print(f"{args.time}s per move, the opponent searches to height {args.opponent} then thinks {args.think}s")
+    print(f"{'pondering':>10} {'mean depth':>11} {'seconds':>8} {'hits':>5} {'misses':>7}  depths")
+    for ponder in (False, True):
+        search = IterativeDeepening(-1, args.time, max_depth = args.max_depth, table = TranspositionTable(1 << 16, policy = 'two-tier'))
+        ponderer = Ponderer(search)
+        opponent = IterativeDeepening(1, time_limit = None, max_depth = args.opponent)
+        board = apply_move(start_board(), (0, 0), 1)
+        depths = []
+        seconds = 0.0
+        for _ in range(args.moves):
+            # The same steps as PlayerTwo.get_play, timed from the opponent's reply
+            start = time.perf_counter()
+            move = ponderer.finish(board, args.time)
+            if move is None:
+                search.time_limit = args.time
+                move = search.get_move(board)
+            seconds += time.perf_counter() - start
+            depths.append(search.completed_depth)
+            board = apply_move(board, move, -1)
+            if Position(board).winner() != 0:
+                break
+            if ponder:
+                ponderer.start(board)
+            reply = opponent.get_move(board)
+            time.sleep(args.think)
+            board = apply_move(board, reply, 1)
+            if Position(board).winner() != 0:
+                break
+        ponderer.cancel()
+        print(f"{'on' if ponder else 'off':>10} {sum(depths) / len(depths):>11.2f} {seconds:>8.2f} {ponderer.hits:>5} {ponderer.misses:>7}  {depths}")
+
+def main():
+    parser = argparse.ArgumentParser(description="HashMind benchmarks")
+    benchmarks = parser.add_subparsers(dest="benchmark", required=True)
+
+    parallel = benchmarks.add_parser("parallel", help="speedup of the parallel root search as workers are added")
+    parallel.add_argument("--height", type=int, default=4)
+    parallel.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parallel.add_argument("--repeat", type=int, default=3)
+    parallel.set_defaults(run=bench_parallel)
+
+    cascade = benchmarks.add_parser("overflow", help="scalar against NumPy overflow engine as the grid grows")
+    cascade.add_argument("--sizes", type=int, nargs="+", default=[6, 8, 12, 16, 24, 32, 48, 64])
+    cascade.add_argument("--boards", type=int, default=3)
+    cascade.add_argument("--repeat", type=int, default=3)
+    cascade.set_defaults(run=bench_overflow)
+
+    cache = benchmarks.add_parser("cache", help="minimax with and without the overflow cache")
+    cache.add_argument("--height", type=int, default=4)
+    cache.add_argument("--min-steps", type=int, nargs="+", default=[1, 2])
+    cache.add_argument("--entries", type=int, default=65536)
+    cache.add_argument("--repeat", type=int, default=3)
+    cache.set_defaults(run=bench_cache)
+
+    hashtable = benchmarks.add_parser("hashtable", help="speed and memory of the hash tables as they grow")
+    hashtable.add_argument("--sizes", type=int, nargs="+", default=[10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6])
+    hashtable.set_defaults(run=bench_hashtable)
+
+    latency = benchmarks.add_parser("latency", help="insert latency percentiles with and without incremental resizing")
+    latency.add_argument("--entries", type=int, default=10 ** 6)
+    latency.set_defaults(run=bench_latency)
+
+    replacement = benchmarks.add_parser("replacement", help="transposition table replacement policies at a fixed size")
+    replacement.add_argument("--entries", type=int, default=2048)
+    replacement.add_argument("--height", type=int, default=6)
+    replacement.set_defaults(run=bench_replacement)
+
+    ponder = benchmarks.add_parser("ponder", help="search depth per move with and without pondering")
+    ponder.add_argument("--time", type=float, default=0.3, help="seconds per move")
+    ponder.add_argument("--think", type=float, default=0.3, help="seconds the opponent takes on top of its search")
+    ponder.add_argument("--opponent", type=int, default=2, help="search height of the opponent")
+    ponder.add_argument("--max-depth", type=int, default=12)
+    ponder.add_argument("--moves", type=int, default=12)
+    ponder.set_defaults(run=bench_ponder)
+
+    args = parser.parse_args()
+    args.run(args)
+
+if __name__ == '__main__':
+    main()
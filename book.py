@@ -0,0 +1,152 @@
+#    Main Author(s): Ahmed Kursi
+#    Main Reviewer(s): Ahmed Kursi
+#
+#   Opening book: the best move of every position in the first plies from the standard
+#   start, searched deeply offline and stored in a snapshot file (see snapshot.py).
+#   To build it, run: python book.py build --plies 2 --depth 6
+
+import argparse
+import os
+import time
+
+from a2_partb import IterativeDeepening, get_moves, apply_move
+from position import Position
+from snapshot import write_snapshot, SnapshotTable
+from symmetry import map_move
+
+# The position game.py starts from: player 1 in the top left corner, player 2 in the
+# bottom right corner, player 1 to move
+START_ROWS = 5
+START_COLS = 6
+
+def start_board(rows = START_ROWS, cols = START_COLS):
+    board = [[0] * cols for _ in range(rows)]
+    board[0][0] = 1
+    board[rows - 1][cols - 1] = -1
+    return board
+
+# Default book file, next to this module. The committed one was built with
+#   python book.py build --plies 2 --depth 6
+# and must be rebuilt the same way whenever the search or the evaluation changes
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'opening_book.bin')
+# A book entry: row and column of the move on the canonical board, and the search depth
+BOOK_FORMAT = 'BBB'
+
+# Returns (key, transform) a position is stored under. Positions that are mirror images
+# of each other share an entry, the transform maps the move back (see symmetry.py)
+def book_key(board, player):
+    return Position(board, player, symmetric = True).canonical_key(swap_colors = False)
+
+# Returns the (board, player to move) of every distinct position reached in fewer than
+# plies moves from the start, mirror images counted once. Finished games are left out
+def book_positions(plies, board = None, player = 1):
+    board = board if board is not None else start_board()
+    positions = []
+    seen = set()
+    level = [(board, player)]
+    for ply in range(plies):
+        following = []
+        for (board, player) in level:
+            key = book_key(board, player)[0]
+            if key in seen:
+                continue
+            seen.add(key)
+            positions.append((board, player))
+            for move in get_moves(board, player):
+                child = apply_move(board, move, player)
+                if Position(child).winner() == 0:
+                    following.append((child, -player))
+        level = following
+    return positions
+
+# Searches every book position depth plies deep and writes the best moves to path.
+# Returns the number of positions stored
+def build_book(path = BOOK_PATH, plies = 2, depth = 6, report = None):
+    # One search per player, so each keeps its transposition table across the positions
+    searches = {player: IterativeDeepening(player, time_limit = None, max_depth = depth) for player in (1, -1)}
+    entries = {}
+    positions = book_positions(plies)
+    for number, (board, player) in enumerate(positions):
+        start = time.perf_counter()
+        move = searches[player].get_move(board)
+        if move is None:
+            continue
+        (key, transform) = book_key(board, player)
+        (row, col) = map_move(move, transform, len(board), len(board[0]))
+        entries[key] = (row, col, searches[player].completed_depth)
+        if report is not None:
+            report(number + 1, len(positions), time.perf_counter() - start)
+    write_snapshot(entries, path, BOOK_FORMAT)
+    return len(entries)
+
+# Read-only opening book opened from a file built by build_book. Counts the lookups it
+# could and could not answer
+class OpeningBook:
+    def __init__(self, path = BOOK_PATH):
+        self.path = path
+        self.table = SnapshotTable(path)
+        self.hits = 0
+        self.misses = 0
+
+    # Returns the book move for the player in this position, or None if it is not in the book
+    def lookup(self, board, player):
+        (key, transform) = book_key(board, player)
+        entry = self.table.search(key)
+        move = None
+        if entry is not None:
+            move = map_move((entry[0], entry[1]), transform, len(board), len(board[0]))
+            # Never trust a move that cannot be played here
+            if move not in get_moves(board, player):
+                move = None
+        if move is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return move
+
+    # Fraction of lookups answered by the book
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self):
+        return len(self.table)
+
+    def close(self):
+        self.table.close()
+
+# Returns a new handle on the book at path, or None when there is no such file. Every
+# handle maps the file on its own, so closing one leaves the others open, and the pages
+# are still read once since the mappings share the page cache
+def load_book(path = BOOK_PATH):
+    if not os.path.exists(path):
+        return None
+    return OpeningBook(path)
+
+def main():
+    parser = argparse.ArgumentParser(description="HashMind opening book")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="search the opening positions and write the book")
+    build.add_argument("--plies", type=int, default=2, help="positions up to this many moves from the start")
+    build.add_argument("--depth", type=int, default=6, help="search height for every position")
+    build.add_argument("--output", default=BOOK_PATH)
+
+    info = commands.add_parser("info", help="show what a book holds")
+    info.add_argument("--book", default=BOOK_PATH)
+
+    args = parser.parse_args()
+    if args.command == "build":
+        def report(done, total, seconds):
+            print(f"{done:>5}/{total} positions, last one {seconds:.2f}s")
+        count = build_book(args.output, args.plies, args.depth, report)
+        print(f"{count} positions written to {args.output} ({os.path.getsize(args.output)} bytes)")
+    else:
+        book = OpeningBook(args.book)
+        print(f"{len(book)} positions in {args.book}")
+        move = book.lookup(start_board(), 1)
+        print(f"book move from the start: {move}")
+        book.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#    Main Author(s): Ahmed Kursi
+#    Main Reviewer(s): Ahmed Kursi
+
+from array import array
+
+class FlatBoard:
+    """
+    A compact board: all cells in one flat array of signed bytes, row by row.
+
+    Copying a FlatBoard copies a single 30-byte array instead of allocating a list per row.
+    board[row][col] still works (board[row] is a writable view of the row), so code written
+    for the list-of-lists format can read and change a FlatBoard without being rewritten,
+    and hot loops can use board.cells with the flat index row * cols + col directly.
+    """
+
+    __slots__ = ('rows', 'cols', 'cells')
+
+    def __init__(self, rows, cols, cells=None):
+        """
+        Creates a rows x cols board.
+
+        Args:
+            rows (int): Number of rows.
+            cols (int): Number of columns.
+            cells (array): The cells row by row as array('b'). Defaults to an empty board.
+        """
+        self.rows = rows
+        self.cols = cols
+        self.cells = array('b', bytes(rows * cols)) if cells is None else cells
+
+    @classmethod
+    def from_lists(cls, board):
+        """
+        Creates a FlatBoard from a board in the list-of-lists format.
+        """
+        return cls(len(board), len(board[0]), array('b', [cell for row in board for cell in row]))
+
+    def to_lists(self):
+        """
+        Returns the board in the list-of-lists format.
+        """
+        cells = self.cells.tolist()
+        return [cells[row * self.cols:(row + 1) * self.cols] for row in range(self.rows)]
+
+    def copy(self):
+        """
+        Returns an independent copy of the board.
+        """
+        return FlatBoard(self.rows, self.cols, self.cells[:])
+
+    def index(self, row, col):
+        """
+        Returns the flat index of a cell.
+        """
+        return row * self.cols + col
+
+    def __getitem__(self, row):
+        """
+        Returns a writable view of a row, so board[row][col] reads and writes the cell.
+        """
+        if not 0 <= row < self.rows:
+            raise IndexError('row out of range')
+        return memoryview(self.cells)[row * self.cols:(row + 1) * self.cols]
+
+    def __len__(self):
+        """
+        Returns the number of rows, like len() of a list-of-lists board.
+        """
+        return self.rows
+
+    def __iter__(self):
+        for row in range(self.rows):
+            yield self[row]
+
+    def __eq__(self, other):
+        if isinstance(other, FlatBoard):
+            return self.rows == other.rows and self.cols == other.cols and self.cells == other.cells
+        if isinstance(other, list):
+            return self.to_lists() == other
+        return NotImplemented
+
+    def __repr__(self):
+        return f"FlatBoard({self.to_lists()})"
@@ -1,8 +1,10 @@
 import pygame
 import sys
 import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-from a1_partd import overflow
+from a1_partd import run_overflow
 from a1_partc import Queue
 from player1 import PlayerOne
 from player2 import PlayerTwo 
@@ -139,7 +141,7 @@ class Board:
 
     def do_overflow(self, q):
         oldboard = [row.copy() for row in self.board]
-        numsteps = overflow(self.board, q)
+        numsteps = run_overflow(self.board, q)
         if numsteps != 0:
             self.set(oldboard)
         return numsteps
@@ -172,7 +174,7 @@ class Board:
 # Main game variables
 player1_dropdown = Dropdown(900, 50, 200, 50, ['Human', 'AI'])
 player2_dropdown = Dropdown(900, 110, 200, 50, ['Human', 'AI'])
-difficulty_slider = DifficultySlider(900, 400, 200, 50, 2, 6)
+difficulty_slider = DifficultySlider(900, 400, 200, 50, 2, 8)
 restart_button = Button(900, 460, 200, 50, 'Restart')
 
 current_player = 0
@@ -182,16 +184,22 @@ overflow_boards = Queue()
 overflowing = False
 numsteps = 0
 has_winner = False
-bots = [PlayerOne(), PlayerTwo()]
+bots = [PlayerOne(time_limit=MAX_TIME_FOR_MOVE / 1000), PlayerTwo(time_limit=MAX_TIME_FOR_MOVE / 1000)]
 grid_row = -1
 grid_col = -1
 choice = [None, None]
 start_time = pygame.time.get_ticks()
 frame = 0
+# Bots search on a worker thread so the window keeps drawing and handling events.
+# thinking is (future, player, board, stop) for the move being searched, polled every
+# frame. stop is a fresh event for each search, set to cancel that search only
+ai_worker = ThreadPoolExecutor(max_workers=1)
+thinking = None
 
 # Reset game function
 def reset_game():
     global board, current_player, has_winner, overflow_boards, overflowing, numsteps, choice
+    cancel_thinking()
     board = Board(GRID_SIZE[1], GRID_SIZE[0], p1_sprites, p2_sprites)
     current_player = 0
     has_winner = False
@@ -199,12 +207,29 @@ def reset_game():
     overflowing = False
     numsteps = 0
     choice = [None, None]
+    # A bot still pondering the old game would keep the CPU busy for nothing
+    for bot in bots:
+        bot.stop_pondering()
+
+# Drops the move being searched. A search that already started is told to stop, its
+# move is thrown away when it returns
+def cancel_thinking():
+    global thinking
+    if thinking is not None:
+        (future, _, _, stop) = thinking
+        stop.set()
+        if not future.cancel():
+            future.result()
+        thinking = None
 
 # Game loop
 while running:
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             running = False
+            cancel_thinking()
+            for bot in bots:
+                bot.stop_pondering()
         elif restart_button.is_clicked(event):
             reset_game()
         else:
@@ -213,12 +238,18 @@ while running:
             difficulty_slider.handle_event(event)
             choice[0] = player1_dropdown.get_choice()
             choice[1] = player2_dropdown.get_choice()
+            # The player being searched for was switched to Human
+            if thinking is not None and choice[thinking[1]] != 1:
+                cancel_thinking()
 
             if event.type == pygame.MOUSEBUTTONDOWN:
                 x, y = event.pos
                 row = y - Y_OFFSET
                 col = x - X_OFFSET
                 grid_row, grid_col = row // CELL_SIZE, col // CELL_SIZE
+    # The turn logic below could hand a new search to the worker, which shutdown() would wait for
+    if not running:
+        break
 
     elapsed_time = (pygame.time.get_ticks() - start_time) // 1000
     win = board.check_win()
@@ -239,13 +270,30 @@ while running:
                 overflowing = False
                 current_player = (current_player + 1) % 2
         else:
+            make_move = False
             if choice[current_player] == 1:
-                grid_row, grid_col = bots[current_player].get_play(board.get_board())
-                if not board.valid_move(grid_row, grid_col, current_player):
-                    has_winner = True
-                    winner = ((current_player + 1) % 2) + 1
-                else:
-                    make_move = True
+                if thinking is None:
+                    # The slider sets the deepest search, the time budget decides how far the bot actually gets
+                    bots[current_player].max_depth = difficulty_slider.get_depth()
+                    # Pondering only pays off while a human thinks: against the other bot both
+                    # searches would share one interpreter and slow each other down
+                    bots[current_player].ponder = choice[(current_player + 1) % 2] == 0
+                    position = board.get_board()
+                    stop = threading.Event()
+                    future = ai_worker.submit(bots[current_player].get_play, position, stop)
+                    thinking = (future, current_player, position, stop)
+                elif thinking[0].done():
+                    (future, player, position, _) = thinking
+                    thinking = None
+                    # A move searched for another player or another board is stale, the
+                    # next frame starts a search for the current one
+                    if player == current_player and position == board.get_board():
+                        grid_row, grid_col = future.result()
+                        if not board.valid_move(grid_row, grid_col, current_player):
+                            has_winner = True
+                            winner = ((current_player + 1) % 2) + 1
+                        else:
+                            make_move = True
             elif board.valid_move(grid_row, grid_col, current_player):
                 make_move = True
 
@@ -273,14 +321,21 @@ while running:
     window.blit(timer_text, (900, 750))
 
     if has_winner:
+        # Nothing is left to ponder once the game is over
+        for bot in bots:
+            bot.stop_pondering()
         text = bigfont.render(f"Player {winner} wins!", True, BLACK)
         window.blit(text, (300, 250))
     else:
-        status_text = font.render(f"Player {current_player + 1}'s turn", True, BLACK)
+        status = f"Player {current_player + 1}'s turn"
+        if thinking is not None:
+            status = f"Player {current_player + 1} is thinking" + "." * (math.floor(frame) % 4)
+        status_text = font.render(status, True, BLACK)
         window.blit(status_text, (X_OFFSET, 750))
 
     pygame.display.update()
     pygame.time.delay(100)
 
+ai_worker.shutdown()
 pygame.quit()
 sys.exit()
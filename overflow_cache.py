@@ -0,0 +1,92 @@
+#    Main Author(s): Ahmed Kursi
+#    Main Reviewer(s): Ahmed Kursi
+
+import sys
+from array import array
+from collections import OrderedDict
+
+class OverflowCache:
+    """
+    A bounded cache of resolved overflow cascades, from (position key, played cell) to
+    the cells the move changed and their values afterwards.
+
+    A search reaches the same position again through other move orders and other
+    searches, and the same move there triggers the same cascade, so Position.play can
+    replace a long cascade by one lookup. When the cache is over its entry or byte limit
+    the least recently used cascade is evicted.
+    """
+
+    def __init__(self, max_entries=65536, max_bytes=None, min_steps=1):
+        """
+        Creates an empty cache.
+
+        Args:
+            max_entries (int): Most cascades kept at once.
+            max_bytes (int): Optional limit on the memory used by the stored cascades.
+            min_steps (int): Shortest cascade worth storing, in overflow waves. A move that
+                does not overflow is cheaper to play again than to look up.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.min_steps = min_steps
+        # (key, cell) -> (changed cells, values after the move, waves), least recently used first
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, key, cell):
+        """
+        Returns the (cells, values, waves) stored for playing the flat index cell in the
+        position with Zobrist key key, or None.
+        """
+        entry = self.entries.get((key, cell))
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end((key, cell))
+        return entry
+
+    def store(self, key, cell, cells, values, steps):
+        """
+        Remembers a resolved cascade: the flat indices it touched and their values
+        afterwards, and the number of waves it took. Short cascades are not stored.
+
+        Returns:
+            bool: True if the cascade was stored.
+        """
+        if steps < self.min_steps or (key, cell) in self.entries:
+            return False
+        entry = (array('H', cells), array('b', values), steps)
+        self.entries[(key, cell)] = entry
+        self.bytes += self._size(entry)
+        while len(self.entries) > self.max_entries or (self.max_bytes is not None and self.bytes > self.max_bytes):
+            (_, evicted) = self.entries.popitem(last=False)
+            self.bytes -= self._size(evicted)
+            self.evictions += 1
+        return True
+
+    def _size(self, entry):
+        """
+        Approximate memory used by one stored cascade, in bytes.
+        """
+        return sys.getsizeof(entry[0]) + sys.getsizeof(entry[1])
+
+    def hit_rate(self):
+        """
+        Returns the fraction of lookups that found the cascade.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self):
+        """
+        Forgets every cascade, keeping the counters.
+        """
+        self.entries.clear()
+        self.bytes = 0
+
+    def __len__(self):
+        return len(self.entries)
@@ -1,14 +1,58 @@
-from a2_partb import GameTree
+from a2_partb import IterativeDeepening, TranspositionTable, apply_move
+from book import load_book, BOOK_PATH
+from ponder import Ponderer
 
 class PlayerTwo:
 
-    def __init__(self, name = "P2 Bot"):
+    def __init__(self, name = "P2 Bot", time_limit = 1.0, node_limit = None, max_depth = 6, book_path = BOOK_PATH, ponder = False):
         self.name = name
+        # Search budget for each move: seconds, visited positions and the deepest height tried
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.max_depth = max_depth
+        # Opening book answering the first moves without a search, None when there is no book file
+        self.book = load_book(book_path) if book_path is not None else None
+        # One search for the whole game: its table keeps what the last move searched, so the
+        # next move starts from there. The table is bounded to keep the memory flat
+        self.search = IterativeDeepening(-1, time_limit, node_limit, max_depth, table = TranspositionTable(1 << 16, policy = 'two-tier'))
+        # With pondering on, the search goes on in the background on the reply it expects
+        # while the opponent thinks. game.py turns it on against a human
+        self.ponder = ponder
+        self.ponderer = Ponderer(self.search)
 
     def get_name(self):
         return self.name
 
-    def get_play(self, board):
-        tree = GameTree(board, -1)
-        (row,col) = tree.get_move()
+    # stop is an optional threading.Event another thread can set to make this call return
+    # as soon as possible, with the move of the deepest search finished so far. It belongs
+    # to this call only: a cancelled call does not start pondering, and later calls search as usual
+    def get_play(self, board, stop = None):
+        # The pondering search shares self.search, so it is ended first
+        move = self.ponderer.finish(board, self.time_limit, stop)
+        if move is None:
+            move = self.choose(board, stop)
+        if self.ponder and (stop is None or not stop.is_set()):
+            self.search.node_limit = self.node_limit
+            self.search.max_depth = self.max_depth
+            self.ponderer.start(apply_move(board, move, -1))
+        return move
+
+    # Stops a pondering search, e.g. when the game is restarted
+    def stop_pondering(self):
+        self.ponderer.cancel()
+
+    def choose(self, board, stop = None):
+        if self.book is not None:
+            move = self.book.lookup(board, -1)
+            if move is not None:
+                return move
+        # The budget can be changed between moves, game.py sets max_depth from its slider
+        self.search.time_limit = self.time_limit
+        self.search.node_limit = self.node_limit
+        self.search.max_depth = self.max_depth
+        self.search.stop = stop
+        try:
+            (row,col) = self.search.get_move(board)
+        finally:
+            self.search.stop = None
         return (row,col)
\ No newline at end of file
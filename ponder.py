@@ -0,0 +1,156 @@
+#    Main Author(s): Ahmed Kursi
+#    Main Reviewer(s): Ahmed Kursi
+#
+#   Pondering: searching on the opponent's time. After the bot moves, the reply its search
+#   expects is played and the position after it is searched in a background thread while
+#   the opponent thinks. If the opponent plays that reply the search goes on for the
+#   bot's own time budget and its work is kept, otherwise it is stopped and thrown away.
+#   A bot with only a node budget spends it all on the opponent's time.
+
+import threading
+import time
+
+from a2_partb import get_moves, apply_move
+from position import Position
+from symmetry import map_move
+
+class Ponderer:
+    """
+    Runs an IterativeDeepening search on the predicted position in a background thread.
+
+    The search object is shared with the player: its transposition table and move ordering
+    keep what the pondering learned, and the player must call finish() before using it again.
+    """
+
+    def __init__(self, search):
+        """
+        Args:
+            search (IterativeDeepening): The search of the player that ponders.
+        """
+        self.search = search
+        # The board the pondering searches, with the predicted reply played, and its result
+        self.board = None
+        self.move = None
+        self.thread = None
+        self.stop = threading.Event()
+        # Replies predicted right and wrong
+        self.hits = 0
+        self.misses = 0
+
+    def predict(self, board):
+        """
+        Returns the reply the table holds as best for the opponent to move on board, or None.
+        """
+        opponent = -self.search.player
+        position = Position(board, opponent, symmetric = self.search.symmetric)
+        if self.search.symmetric:
+            (key, transform) = position.canonical_key(swap_colors = False)
+        else:
+            (key, transform) = (position.key, None)
+        entry = self.search.table.probe(key)
+        if entry is None or entry[3] is None:
+            return None
+        move = entry[3]
+        if transform is not None:
+            move = map_move(move, transform, len(board), len(board[0]))
+        return move if move in get_moves(board, opponent) else None
+
+    def start(self, board):
+        """
+        Starts pondering after the player's move. board is the board after that move and
+        its overflow, with the opponent to move.
+
+        Returns:
+            bool: True if a search was started, False if no reply could be predicted or the game is over.
+        """
+        self.cancel()
+        if Position(board).winner() != 0:
+            return False
+        reply = self.predict(board)
+        if reply is None:
+            return False
+        self.board = apply_move(board, reply, -self.search.player)
+        if Position(self.board).winner() != 0:
+            return False
+        self.move = None
+        self.stop.clear()
+        self.thread = threading.Thread(target = self._run, daemon = True)
+        self.thread.start()
+        return True
+
+    def _run(self):
+        # The opponent's time has no limit known in advance, so only the stop event, the
+        # node budget and max_depth end the search. The budget is put back afterwards
+        budget = (self.search.time_limit, self.search.node_limit)
+        self.search.time_limit = None
+        self.search.stop = self.stop
+        try:
+            self.move = self.search.get_move(self.board)
+        finally:
+            self.search.stop = None
+            (self.search.time_limit, self.search.node_limit) = budget
+
+    def finish(self, board, time_limit, stop = None):
+        """
+        Ends the pondering once the opponent has replied.
+
+        Args:
+            board (list): The board the player now has to move on.
+            time_limit (float): Seconds the search may go on when the reply was predicted right,
+                None to let it finish: it then stops at the search's node_limit or max_depth.
+            stop (threading.Event): Optional event that cuts that wait short when set.
+
+        Returns:
+            tuple: The move found if the reply was predicted right, None otherwise or when
+            nothing was pondered.
+        """
+        if self.thread is None:
+            return None
+        if board == self.board:
+            self.wait(time_limit, stop)
+            self.cancel()
+            self.hits += 1
+            # A search stopped before finishing depth 1 only guessed its move
+            return self.move if self.search.completed_depth > 0 else None
+        self.cancel()
+        self.misses += 1
+        return None
+
+    def wait(self, time_limit, stop):
+        """
+        Waits for the pondering search to end, at most time_limit seconds (None for no limit),
+        checking the stop event every few milliseconds.
+        """
+        if stop is None:
+            self.thread.join(time_limit)
+            return
+        deadline = None if time_limit is None else time.perf_counter() + time_limit
+        while self.thread.is_alive() and not stop.is_set():
+            step = 0.01 if deadline is None else min(0.01, deadline - time.perf_counter())
+            if step <= 0:
+                return
+            self.thread.join(step)
+
+    def cancel(self):
+        """
+        Stops the pondering search, if any, and waits for its thread to end.
+        """
+        # Read once: the thread that owns the search may be ending the pondering as well
+        thread = self.thread
+        if thread is not None:
+            self.stop.set()
+            thread.join()
+            self.thread = None
+
+    def pondering(self):
+        """
+        Returns whether a pondering search is still running.
+        """
+        return self.thread is not None and self.thread.is_alive()
+
+    def hit_rate(self):
+        """
+        Returns the fraction of pondered replies the opponent actually played.
+        """
+        guesses = self.hits + self.misses
+        return self.hits / guesses if guesses else 0.0
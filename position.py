@@ -0,0 +1,216 @@
+#    Main Author(s): Ahmed Kursi
+#    Main Reviewer(s): Ahmed Kursi
+
+from a1_partc import Stack
+from a1_partd import run_overflow, get_geometry
+from flatboard import FlatBoard
+from zobrist import get_zobrist
+from symmetry import get_key_offsets, symmetric_keys
+
+class Position:
+    """
+    A board together with the player to move and running totals about it: the number of
+    pieces and of cells each player owns, and the Zobrist key.
+
+    The totals are updated for the cells a move and its overflow cascade change, so
+    evaluating the position and checking for a winner take O(1) instead of a scan of
+    the board, and the cascade does not have to count the cells after every wave.
+
+    Every move played is recorded on an undo stack with the old values of the cells it
+    changed, so a depth-first search can play and undo moves on one shared position
+    instead of copying the board for every child.
+
+    With symmetric=True it also keeps the keys of the board under the four symmetries,
+    with and without the colours swapped, so canonical_key() is O(1) as well.
+
+    With an OverflowCache, a move whose cascade was already resolved in the same position
+    is replayed from the cache instead of resolving the cascade again.
+    """
+
+    def __init__(self, board, player=1, symmetric=False, cache=None):
+        """
+        Creates a position from a board in either format.
+
+        Args:
+            board (list or FlatBoard): The board. It is copied.
+            player (int): The player to move, 1 or -1.
+            symmetric (bool): Whether to keep the keys canonical_key() needs up to date.
+            cache (OverflowCache): Optional cache of resolved cascades, can be shared.
+        """
+        self.board = board.copy() if isinstance(board, FlatBoard) else FlatBoard.from_lists(board)
+        self.player = player
+        self.geometry = get_geometry(self.board.rows, self.board.cols)
+        self.zobrist = get_zobrist(self.board.rows, self.board.cols)
+        # player -> number of pieces, and player -> number of cells owned
+        self.pieces = {1: 0, -1: 0}
+        self.cells = {1: 0, -1: 0}
+        self.key = self.zobrist.key_of(self.board, player)
+        self.symmetric = symmetric_keys(self.zobrist, self.board) if symmetric else None
+        self.cache = cache
+        # Cells left overflowing when a cascade stopped early because a player had won
+        self.unstable = []
+        # (changed cells, player, key, symmetric keys, unstable cells, totals) before each move, most recent on top
+        self.history = Stack()
+        for index, cell in enumerate(self.board.cells):
+            if cell != 0:
+                owner = 1 if cell > 0 else -1
+                self.pieces[owner] += abs(cell)
+                self.cells[owner] += 1
+            if abs(cell) >= self.geometry.thresholds[index]:
+                self.unstable.append(index)
+
+    def copy(self):
+        """
+        Returns an independent copy of the position.
+        """
+        other = Position.__new__(Position)
+        other.board = self.board.copy()
+        other.player = self.player
+        other.geometry = self.geometry
+        other.zobrist = self.zobrist
+        other.pieces = dict(self.pieces)
+        other.cells = dict(self.cells)
+        other.key = self.key
+        other.symmetric = list(self.symmetric) if self.symmetric is not None else None
+        other.cache = self.cache
+        other.unstable = list(self.unstable)
+        other.history = Stack()
+        return other
+
+    def _account(self, index, old, new):
+        """
+        Updates the totals and the key for one cell that changed from old to new.
+        """
+        if old != 0:
+            owner = 1 if old > 0 else -1
+            self.pieces[owner] -= abs(old)
+            self.cells[owner] -= 1
+        if new != 0:
+            owner = 1 if new > 0 else -1
+            self.pieces[owner] += abs(new)
+            self.cells[owner] += 1
+        row, col = divmod(index, self.board.cols)
+        self.key = self.zobrist.update(self.key, row, col, old, new)
+        if self.symmetric is not None:
+            keys = self.zobrist.keys
+            for k, offset in enumerate(get_key_offsets(self.zobrist)[index]):
+                if k < 4:
+                    self.symmetric[k] ^= keys[offset + old] ^ keys[offset + new]
+                else:
+                    self.symmetric[k] ^= keys[offset - old] ^ keys[offset - new]
+
+    def canonical_key(self, swap_colors=True):
+        """
+        Returns (key, transform) for the canonical form of the position, the same as
+        symmetry.canonical gives: the colours are swapped when player -1 is to move, then
+        the symmetry with the smallest key is used. Positions equal up to a symmetry (and a
+        colour swap) get the same key, and symmetry.map_move(move, transform, rows, cols)
+        maps moves to and from that form.
+
+        With swap_colors=False only the board symmetries are used and the key includes the
+        player to move, like self.key does.
+        """
+        if swap_colors and self.player == -1:
+            keys = self.symmetric[4:8]
+        else:
+            keys = self.symmetric[0:4]
+        key = min(keys)
+        transform = keys.index(key)
+        if not swap_colors and self.player == -1:
+            key ^= self.zobrist.side
+        return key, transform
+
+    def play(self, move, a_queue=None):
+        """
+        Plays a move for the player to move, resolves the overflow and passes the turn.
+
+        Args:
+            move (tuple): The (row, col) cell to play.
+            a_queue (Queue): Optional queue receiving the board after every overflow wave, as in overflow.
+
+        Returns:
+            dict: The cells that changed, as (row, col) -> value before the move.
+        """
+        (row, col) = move
+        cells = self.board.cells
+        index = row * self.board.cols + col
+        touched = {(row, col): cells[index]}
+        totals = (self.pieces[1], self.pieces[-1], self.cells[1], self.cells[-1])
+        symmetric = tuple(self.symmetric) if self.symmetric is not None else None
+        self.history.push((touched, self.player, self.key, symmetric, self.unstable, totals))
+        thresholds = self.geometry.thresholds
+        # Only moves that start a cascade are worth caching, and the boards after
+        # every wave are not cached, only the final one
+        cache = self.cache
+        if a_queue is not None or (abs(cells[index]) + 1 < thresholds[index] and not self.unstable):
+            cache = None
+        entry = cache.lookup(self.key, index) if cache is not None else None
+        if entry is not None:
+            (changed_cells, values, steps) = entry
+            for changed, value in zip(changed_cells, values):
+                touched[divmod(changed, self.board.cols)] = cells[changed]
+                cells[changed] = value
+        else:
+            cells[index] += self.player
+            # Only the played cell and cells left over from an unfinished cascade can overflow,
+            # most moves overflow nothing and do not need an engine at all
+            steps = 0
+            if abs(cells[index]) >= thresholds[index] or self.unstable:
+                start = [(row, col)] + [divmod(cell, self.board.cols) for cell in self.unstable]
+                negatives = self.cells[-1] - (touched[(row, col)] < 0) + (cells[index] < 0)
+                # The engine set_overflow_backend chose, as for the boards game.py plays
+                steps = run_overflow(self.board, a_queue, touched, start, negatives)
+            if cache is not None and steps >= cache.min_steps:
+                changed_cells = [r * self.board.cols + c for (r, c) in touched]
+                cache.store(self.key, index, changed_cells, [cells[changed] for changed in changed_cells], steps)
+        self.unstable = []
+        for (r, c), old in touched.items():
+            changed = r * self.board.cols + c
+            if cells[changed] != old:
+                self._account(changed, old, cells[changed])
+            if abs(cells[changed]) >= thresholds[changed]:
+                self.unstable.append(changed)
+        self.player = -self.player
+        self.key = self.zobrist.toggle_side(self.key)
+        return touched
+
+    def undo(self):
+        """
+        Takes back the last move played, restoring only the cells it changed.
+
+        Raises:
+            IndexError: If no move is left to undo.
+        """
+        (touched, player, key, symmetric, unstable, totals) = self.history.pop()
+        cells = self.board.cells
+        cols = self.board.cols
+        for (row, col), old in touched.items():
+            cells[row * cols + col] = old
+        (self.pieces[1], self.pieces[-1], self.cells[1], self.cells[-1]) = totals
+        self.player = player
+        self.key = key
+        if symmetric is not None:
+            self.symmetric = list(symmetric)
+        self.unstable = unstable
+
+    def evaluate(self, player):
+        """
+        Scores the position for the player in O(1), with the same rules as evaluate_board.
+        """
+        gem = self.pieces[player]
+        total = self.pieces[1] + self.pieces[-1]
+        if gem == total:
+            return 100
+        if gem == 0:
+            return -100
+        return (gem * 100) // total
+
+    def winner(self):
+        """
+        Returns the player who owns every occupied cell, or 0 while both players still have cells.
+        """
+        if self.cells[1] > 0 and self.cells[-1] == 0:
+            return 1
+        if self.cells[-1] > 0 and self.cells[1] == 0:
+            return -1
+        return 0
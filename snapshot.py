@@ -0,0 +1,186 @@
+#    Main Author(s): Ahmed Kursi
+#    Main Reviewer(s): Ahmed Kursi
+
+import mmap
+import os
+import struct
+
+# File layout, all little-endian:
+#   header    magic, version, value format, number of slots, number of entries (HEADER)
+#   bitmap    one bit per slot telling whether it is used, padded to 8 bytes
+#   slots     fixed-width (key, value) records: an unsigned 64-bit key then the value
+#             packed with the struct format given when the snapshot was written
+# An entry sits in slot key % slots or, when that is taken, in one of the slots after it
+# (linear probing), so a lookup reads only the pages of the slots it probes
+MAGIC = b'HASHMIND'
+VERSION = 1
+HEADER = struct.Struct('<8sI16sQQ')
+HEADER_SIZE = 48
+
+def write_snapshot(table, path, value_format='q', load=0.5, count=None):
+    """
+    Writes the entries of a table to a snapshot file that SnapshotTable can open.
+
+    Args:
+        table (HashTable, dict or Iterable): A table or dict with integer keys, or (key, value) pairs.
+            Keys must fit in an unsigned 64-bit integer, like Zobrist keys.
+        path (str): The file to write.
+        value_format (str): struct format of a value, without a byte order, e.g. 'q' or 'bhb'.
+            A value with several fields is stored from a tuple.
+        load (float): Fraction of the slots to fill. Lower means shorter probes but a bigger file.
+        count (int): The number of pairs, when table is an iterator that cannot tell its length.
+            The file is sized for it, so the iterator must not give more pairs.
+
+    Returns:
+        int: The number of entries written.
+
+    Raises:
+        ValueError: If load is not between 0 and 1 (excluded), value_format is too long, there
+            are more pairs than count or a key is given twice.
+        struct.error: If a key or value does not fit the format.
+    """
+    if not 0 < load < 1:
+        raise ValueError('load must be between 0 and 1')
+    if len(value_format) > 16:
+        raise ValueError('value format must be at most 16 characters')
+    # Tables are read lazily, only pairs of unknown number are collected first
+    entries = table.items() if hasattr(table, 'items') else table
+    if count is None:
+        if not hasattr(table, '__len__'):
+            entries = list(entries)
+        count = len(table) if hasattr(table, '__len__') else len(entries)
+    slots = max(1, int(count / load) + 1)
+    record = struct.Struct('<Q' + value_format)
+    bitmap_size = (slots + 63) // 64 * 8
+    size = HEADER_SIZE + bitmap_size + slots * record.size
+    with open(path, 'w+b') as file:
+        file.truncate(size)
+        with mmap.mmap(file.fileno(), size) as mapped:
+            written = 0
+            for key, value in entries:
+                # The slots are sized for count entries, one more could leave no free slot to probe
+                if written == count:
+                    raise ValueError(f'more than the {count} pairs announced')
+                index = key % slots
+                while mapped[HEADER_SIZE + index // 8] & (1 << (index % 8)):
+                    offset = HEADER_SIZE + bitmap_size + index * record.size
+                    if struct.unpack_from('<Q', mapped, offset)[0] == key:
+                        raise ValueError(f'key {key} is given twice')
+                    index = (index + 1) % slots
+                mapped[HEADER_SIZE + index // 8] |= 1 << (index % 8)
+                offset = HEADER_SIZE + bitmap_size + index * record.size
+                if isinstance(value, tuple):
+                    record.pack_into(mapped, offset, key, *value)
+                else:
+                    record.pack_into(mapped, offset, key, value)
+                written += 1
+            # The header goes last, with the number of entries actually written
+            HEADER.pack_into(mapped, 0, MAGIC, VERSION, value_format.encode('ascii'), slots, written)
+            mapped.flush()
+    return written
+
+class SnapshotTable:
+    """
+    A read-only hash table backed by a snapshot file mapped into memory.
+
+    Opening reads only the header, lookups read the mapped pages directly, and the pages
+    are shared through the page cache by every process that opens the same file, so a
+    large table built offline is ready as soon as it is opened.
+    It answers search, capacity and __len__ like HashTable, and can be used as a context manager.
+    """
+
+    def __init__(self, path):
+        """
+        Opens a snapshot written by write_snapshot.
+
+        Args:
+            path (str): The snapshot file.
+
+        Raises:
+            ValueError: If the file is not a snapshot of a version this code reads, or is truncated.
+        """
+        self.path = path
+        with open(path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size < HEADER_SIZE:
+                raise ValueError(f'{path} is too short to be a HashMind snapshot')
+            self._mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, value_format, slots, entries) = HEADER.unpack_from(self._mapped, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mapped.close()
+            raise ValueError(f'{path} is not a HashMind snapshot of version {VERSION}')
+        try:
+            self.value_format = value_format.rstrip(b'\0').decode('ascii')
+            self._record = struct.Struct('<Q' + self.value_format)
+        except (UnicodeDecodeError, struct.error):
+            self._mapped.close()
+            raise ValueError(f'{path} has an invalid value format')
+        self._slots = slots
+        self.size = entries
+        self._bitmap_size = (slots + 63) // 64 * 8
+        self._records = HEADER_SIZE + self._bitmap_size
+        if slots == 0 or len(self._mapped) < self._records + slots * self._record.size:
+            self._mapped.close()
+            raise ValueError(f'{path} is truncated')
+
+    def _unpack(self, index):
+        """
+        Returns (key, value) of a used slot.
+        """
+        fields = self._record.unpack_from(self._mapped, self._records + index * self._record.size)
+        return fields[0], (fields[1] if len(fields) == 2 else fields[1:])
+
+    def _used(self, index):
+        """
+        Returns whether a slot holds an entry.
+        """
+        return self._mapped[HEADER_SIZE + index // 8] & (1 << (index % 8))
+
+    def search(self, key):
+        """
+        Searches for a key in the table and returns its associated value.
+
+        Args:
+            key (int): The key to search for.
+
+        Returns:
+            Any: The value (a tuple when the format has several fields) if found, None if the key is not found.
+        """
+        index = key % self._slots
+        while self._used(index):
+            (slot_key, value) = self._unpack(index)
+            if slot_key == key:
+                return value
+            index = (index + 1) % self._slots
+        return None
+
+    def items(self):
+        """
+        Returns a lazy iterator over the (key, value) pairs in the file, in slot order.
+        """
+        for index in range(self._slots):
+            if self._used(index):
+                yield self._unpack(index)
+
+    def capacity(self):
+        """
+        Returns the number of slots in the file.
+        """
+        return self._slots
+
+    def __len__(self):
+        """
+        Returns the number of entries in the file.
+        """
+        return self.size
+
+    def close(self):
+        """
+        Unmaps the file.
+        """
+        self._mapped.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,124 @@
+#    Main Author(s): Ahmed Kursi
+#    Main Reviewer(s): Ahmed Kursi
+
+from flatboard import FlatBoard
+from zobrist import get_zobrist, MAX_COUNT
+
+# The four symmetries of a rectangular board. Every one of them is its own inverse,
+# so mapping a move back from the canonical board uses the same transform again
+IDENTITY = 0
+FLIP_HORIZONTAL = 1   # mirror left to right
+FLIP_VERTICAL = 2     # mirror top to bottom
+ROTATE_180 = 3        # both flips
+TRANSFORMS = (IDENTITY, FLIP_HORIZONTAL, FLIP_VERTICAL, ROTATE_180)
+
+def map_move(move, transform, rows, cols):
+    """
+    Returns where a (row, col) cell goes under a transform. Applying the same
+    transform to the result gives the original cell back.
+    """
+    (row, col) = move
+    if transform == FLIP_HORIZONTAL or transform == ROTATE_180:
+        col = cols - 1 - col
+    if transform == FLIP_VERTICAL or transform == ROTATE_180:
+        row = rows - 1 - row
+    return (row, col)
+
+_index_maps = {}
+
+def get_index_maps(rows, cols):
+    """
+    Returns, for each transform, a tuple giving the flat index every cell is moved to.
+    Built once per board shape.
+    """
+    if (rows, cols) not in _index_maps:
+        maps = []
+        for transform in TRANSFORMS:
+            mapping = []
+            for index in range(rows * cols):
+                (row, col) = map_move(divmod(index, cols), transform, rows, cols)
+                mapping.append(row * cols + col)
+            maps.append(tuple(mapping))
+        _index_maps[(rows, cols)] = tuple(maps)
+    return _index_maps[(rows, cols)]
+
+def transform_board(board, transform, swap_colors=False):
+    """
+    Returns a transformed copy of a board as a FlatBoard, with the colours swapped
+    (every count negated) if swap_colors is True.
+    """
+    flat = board if isinstance(board, FlatBoard) else FlatBoard.from_lists(board)
+    mapping = get_index_maps(flat.rows, flat.cols)[transform]
+    result = FlatBoard(flat.rows, flat.cols)
+    sign = -1 if swap_colors else 1
+    for index, cell in enumerate(flat.cells):
+        result.cells[mapping[index]] = sign * cell
+    return result
+
+def canonical(board, player=1, swap_colors=True):
+    """
+    Maps a position to its canonical form, shared by all the positions that are the
+    same up to a symmetry and a swap of colours.
+
+    The colours are swapped when player -1 is to move, so the canonical position always
+    has player 1 to move, then the transform giving the smallest key is picked.
+
+    The board symmetries are exact: overflow resolves a transformed board into the
+    transformed result. A colour swap is not always, since a cascade stops as soon as
+    no cell is negative but only once every cell is negative, which differs when some
+    cells are empty. Searches that must stay exact use swap_colors=False.
+
+    Args:
+        board (list or FlatBoard): The board.
+        player (int): The player to move.
+        swap_colors (bool): Whether positions with the colours swapped are the same.
+
+    Returns:
+        tuple: (canonical FlatBoard, transform used, whether the colours were swapped).
+        map_move(move, transform, rows, cols) maps moves in either direction.
+    """
+    flat = board if isinstance(board, FlatBoard) else FlatBoard.from_lists(board)
+    swapped = swap_colors and player == -1
+    keys = symmetric_keys(get_zobrist(flat.rows, flat.cols), flat)
+    keys = keys[4:8] if swapped else keys[0:4]
+    # The same choice Position.canonical_key makes, so both agree on the transform
+    transform = keys.index(min(keys))
+    return transform_board(flat, transform, swapped), transform, swapped
+
+_key_offsets = {}
+
+def get_key_offsets(zobrist):
+    """
+    Returns, for every cell, the 8 offsets into zobrist.keys of its count 0 under each
+    transform, first with the colours kept and then with the colours swapped. A cell
+    holding value contributes keys[offset + value] (or keys[offset - value] when swapped).
+    """
+    shape = (zobrist.rows, zobrist.cols)
+    if shape not in _key_offsets:
+        maps = get_index_maps(zobrist.rows, zobrist.cols)
+        middle = (zobrist.span - 1) // 2
+        offsets = []
+        for index in range(zobrist.rows * zobrist.cols):
+            cell = tuple(maps[transform][index] * zobrist.span + middle for transform in TRANSFORMS)
+            offsets.append(cell + cell)
+        _key_offsets[shape] = offsets
+    return _key_offsets[shape]
+
+def symmetric_keys(zobrist, board):
+    """
+    Returns the 8 Zobrist keys of a board (without the side to move): one per transform
+    with the colours kept, then one per transform with the colours swapped.
+
+    Raises:
+        ValueError: If a cell holds more than zobrist.MAX_COUNT pieces.
+    """
+    flat = board if isinstance(board, FlatBoard) else FlatBoard.from_lists(board)
+    offsets = get_key_offsets(zobrist)
+    keys = [0] * 8
+    for index, cell in enumerate(flat.cells):
+        if cell != 0:
+            if not -MAX_COUNT <= cell <= MAX_COUNT:
+                raise ValueError(f'a cell cannot hold {cell} pieces, the keys go up to {MAX_COUNT}')
+            for k, offset in enumerate(offsets[index]):
+                keys[k] ^= zobrist.keys[offset + (cell if k < 4 else -cell)]
+    return keys
@@ -0,0 +1,142 @@
+#
+#   Author: Ahmed Kursi
+#   These are the unit tests for the overflow engines of a1_partd
+#   To use this, run: python test_a1_partd.py
+
+import random
+import unittest
+from a1_partd import overflow, overflow_worklist, get_overflow_list, get_geometry
+from a1_partd import overflow_numpy, run_overflow, set_overflow_backend, numpy
+import a1_partd
+from a1_partc import Queue
+from flatboard import FlatBoard
+
+# Returns a random board where no cell overflows yet, so a single move can start a cascade
+def random_stable_board(generator, rows, cols):
+    board = [[0] * cols for _ in range(rows)]
+    for r in range(rows):
+        for c in range(cols):
+            limit = 4 - (r in (0, rows - 1)) - (c in (0, cols - 1))
+            board[r][c] = generator.randint(0, limit - 1) * generator.choice((1, -1))
+    return board
+
+# Some boards cascade forever under these rules, a queue that gives up after too many waves
+class BoundedQueue(Queue):
+    def enqueue(self, data):
+        if len(self) > 200:
+            raise RuntimeError('cascade does not end')
+        super().enqueue(data)
+
+# Runs an engine and returns (steps, every enqueued board, final grid, touched cells),
+# or None when the cascade does not end
+def run(engine, board, **kwargs):
+    queue = BoundedQueue()
+    touched = {}
+    try:
+        steps = engine(board, queue, touched, **kwargs)
+    except RuntimeError:
+        return None
+    boards = []
+    while not queue.is_empty():
+        boards.append(queue.dequeue())
+    return steps, boards, board, touched
+
+class A1DTestCase(unittest.TestCase):
+    """These are the test cases for the overflow engines"""
+
+    def test_overflow_worklist(self):
+        generator = random.Random(2024)
+
+        # the worklist engine must reproduce overflow wave by wave, for lists and
+        # FlatBoards, with and without the played cell as a starting hint
+        for shape in ((5, 6), (3, 3), (7, 4), (1, 5)):
+            for _ in range(150):
+                board = random_stable_board(generator, *shape)
+                row, col = generator.randrange(shape[0]), generator.randrange(shape[1])
+                player = 1 if board[row][col] > 0 else -1 if board[row][col] < 0 else generator.choice((1, -1))
+                board[row][col] += player
+
+                expected = run(overflow, [r[:] for r in board])
+                self.assertEqual(run(overflow_worklist, [r[:] for r in board]), expected)
+                self.assertEqual(run(overflow_worklist, [r[:] for r in board], start=[(row, col)]), expected)
+
+                flat = run(overflow_worklist, FlatBoard.from_lists(board))
+                if expected is None:
+                    self.assertIsNone(flat)
+                    continue
+                self.assertEqual(flat[0], expected[0])
+                self.assertEqual(flat[1], expected[1])
+                self.assertEqual(flat[2], expected[2])
+
+        # a grid that is already stable is left alone
+        board = random_stable_board(generator, 5, 6)
+        self.assertIsNone(get_overflow_list(board))
+        self.assertEqual(run(overflow_worklist, [r[:] for r in board]), (0, [], board, {}))
+
+        # without a queue only the final grid is produced
+        board = [[0, 0, 0], [0, 4, 0], [0, 0, 0]]
+        expected = run(overflow, [r[:] for r in board])
+        grid = [r[:] for r in board]
+        self.assertEqual(overflow_worklist(grid, None), expected[0])
+        self.assertEqual(grid, expected[2])
+
+    def test_geometry(self):
+        geometry = get_geometry(5, 6)
+        # one table per shape
+        self.assertIs(get_geometry(5, 6), geometry)
+        self.assertIsNot(get_geometry(6, 5), geometry)
+
+        self.assertEqual(geometry.size, 30)
+        self.assertEqual(geometry.thresholds[0], 2)
+        self.assertEqual(geometry.thresholds[29], 2)
+        self.assertEqual(geometry.thresholds[3], 3)
+        self.assertEqual(geometry.thresholds[6], 3)
+        self.assertEqual(geometry.thresholds[8], 4)
+        self.assertEqual(geometry.neighbors[0], (6, 1))
+        self.assertEqual(geometry.neighbors[8], (2, 14, 7, 9))
+        for index in range(30):
+            self.assertEqual(len(geometry.neighbors[index]), geometry.thresholds[index])
+
+        # any shape works, cells overflow at the same counts as before
+        grid = [[2, 0, 3, 1, 0, 0, 0, 1, 3, 2, 1, 2]]
+        self.assertEqual(get_overflow_list(grid), [(0, 0), (0, 2), (0, 8), (0, 11)])
+        self.assertEqual(get_geometry(1, 12).neighbors[5], (4, 6))
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_overflow_numpy(self):
+        generator = random.Random(7)
+
+        # the vectorized engine must reproduce overflow wave by wave
+        for shape in ((5, 6), (2, 2), (1, 5), (9, 12)):
+            for _ in range(100):
+                board = random_stable_board(generator, *shape)
+                row, col = generator.randrange(shape[0]), generator.randrange(shape[1])
+                player = 1 if board[row][col] > 0 else -1 if board[row][col] < 0 else generator.choice((1, -1))
+                board[row][col] += player
+
+                expected = run(overflow, [r[:] for r in board])
+                self.assertEqual(run(overflow_numpy, [r[:] for r in board]), expected)
+                flat = run(overflow_numpy, FlatBoard.from_lists(board))
+                if expected is None:
+                    self.assertIsNone(flat)
+                else:
+                    self.assertEqual(flat[0], expected[0])
+                    self.assertEqual(flat[1], expected[1])
+                    self.assertEqual(flat[2], expected[2])
+                    self.assertEqual(flat[3], expected[3])
+
+        # the backend can be chosen at runtime
+        board = [[0, 0, 0], [0, 4, -1], [0, 0, 0]]
+        expected = run(overflow, [r[:] for r in board])
+        try:
+            for backend in ('python', 'numpy', 'auto'):
+                set_overflow_backend(backend)
+                self.assertEqual(run(run_overflow, [r[:] for r in board]), expected)
+            self.assertRaises(ValueError, set_overflow_backend, 'gpu')
+        finally:
+            set_overflow_backend('auto')
+        self.assertEqual(a1_partd.overflow_backend, 'auto')
+
+
+if __name__ == '__main__':
+    unittest.main()
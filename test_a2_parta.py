@@ -4,7 +4,12 @@
 #   To use this, run: python test_a2_parta.py
 
 import unittest
-from a2_parta import HashTable
+import os
+import random
+import tempfile
+import types
+from a2_parta import HashTable, RobinHoodHashTable, BoundedHashTable
+from snapshot import write_snapshot, SnapshotTable
 
 class A2ATestCase(unittest.TestCase):
     """These are the test cases for functions and classes of a2"""
@@ -311,6 +316,256 @@ class A2ATestCase(unittest.TestCase):
 
 
 
+    def test_HashTable_incremental_resize(self):
+        table = HashTable(incremental = True)
+        plain = HashTable()
+
+        # the capacity doubles at the same sizes, while the entries move over a few at a time
+        for key in range(200):
+            self.assertEqual(table.insert(key, key * 2), True)
+            plain.insert(key, key * 2)
+            self.assertEqual(table.capacity(), plain.capacity())
+            self.assertEqual(len(table), key + 1)
+            self.assertEqual(table.insert(key // 2, 0), False)
+        self.assertIsNotNone(table._old_table)
+
+        # every operation sees entries in both tables until the old one is empty
+        for key in range(0, 200, 3):
+            self.assertEqual(table.modify(key, -key), True)
+        for key in range(0, 200, 5):
+            self.assertEqual(table.remove(key), True)
+            self.assertEqual(table.remove(key), False)
+        for key in range(200):
+            expected = None if key % 5 == 0 else -key if key % 3 == 0 else key * 2
+            self.assertEqual(table.search(key), expected)
+        self.assertEqual(len(table), 160)
+        self.assertIsNone(table._old_table)
+
+
+    def test_HashTable_bulk_and_iteration(self):
+        # presized tables do not resize while the expected entries go in
+        table = HashTable(expected = 1000)
+        self.assertEqual(table.capacity(), 2048)
+        self.assertEqual(HashTable(expected = 22).capacity(), 32)
+        self.assertEqual(HashTable(expected = 23).capacity(), 64)
+        self.assertEqual(table.insert_many((key, key * 2) for key in range(1000)), 1000)
+        self.assertEqual(table.capacity(), 2048)
+        self.assertEqual(len(table), 1000)
+
+        # keys already there are kept by insert_many and replaced by update
+        self.assertEqual(table.insert_many([(0, 5), (1000, 5), (1000, 6)]), 1)
+        self.assertEqual(table.search(0), 0)
+        self.assertEqual(table.search(1000), 5)
+        table.update([(0, 7), (1001, 8)])
+        table.update({1: 9})
+        self.assertEqual((table.search(0), table.search(1001), table.search(1)), (7, 8, 9))
+
+        # a list is loaded with a single resize up front, an iterator grows as it goes
+        table = HashTable()
+        table.insert_many([(key, key) for key in range(100)])
+        self.assertEqual(table.capacity(), 256)
+        table = HashTable(8)
+        self.assertEqual(table.insert_many((key, key) for key in range(100)), 100)
+        self.assertEqual(table.capacity(), 256)
+
+        # the iterators are lazy and see every entry once, in both tables of an incremental resize
+        for incremental in (False, True):
+            table = HashTable(incremental = incremental)
+            for key in range(100):
+                table.insert(key, -key)
+            self.assertIsInstance(table.items(), types.GeneratorType)
+            self.assertEqual(sorted(table.items()), [(key, -key) for key in range(100)])
+            self.assertEqual(sorted(table.keys()), list(range(100)))
+            self.assertEqual(sorted(table.values()), list(range(-99, 1)))
+            self.assertEqual(sorted(table), list(range(100)))
+            copy = HashTable()
+            copy.update(table)
+            self.assertEqual(sorted(copy.items()), sorted(table.items()))
+
+
+    def test_BoundedHashTable(self):
+        # the same answers as HashTable while nothing has to be replaced
+        table = BoundedHashTable(64, 'lru')
+        self.assertEqual(table.capacity(), 64)
+        for key in range(10):
+            self.assertEqual(table.insert(key, key * 2), True)
+            self.assertEqual(table.insert(key, 0), False)
+        self.assertEqual(table.modify(3, 7), True)
+        self.assertEqual(table.modify(30, 7), False)
+        self.assertEqual(table.remove(4), True)
+        self.assertEqual(table.remove(4), False)
+        self.assertEqual([table.search(key) for key in range(6)], [0, 2, 4, 7, None, 10])
+        self.assertEqual(len(table), 9)
+
+        # keys 0, 4, 8... share the first bucket of a table with 4 buckets
+        table = BoundedHashTable(4, 'always')
+        table.insert(0, 'a', depth = 5)
+        table.insert(4, 'b', depth = 1)
+        self.assertEqual((table.search(0), table.search(4)), (None, 'b'))
+        self.assertEqual((table.collisions, table.replacements), (1, 1))
+
+        table = BoundedHashTable(4, 'depth')
+        table.insert(0, 'a', depth = 5)
+        self.assertEqual(table.insert(4, 'b', depth = 1), False)
+        self.assertEqual(table.insert(8, 'c', depth = 5), True)
+        self.assertEqual((table.search(0), table.search(4), table.search(8)), (None, None, 'c'))
+        self.assertEqual((table.collisions, table.replacements), (2, 1))
+
+        # the deep tier keeps the deepest entry, the other tier takes whatever comes
+        table = BoundedHashTable(8, 'two-tier')
+        self.assertEqual(table.buckets, 4)
+        table.insert(0, 'deep', depth = 6)
+        table.insert(4, 'shallow', depth = 1)
+        table.insert(8, 'newer', depth = 2)
+        self.assertEqual([table.search(key) for key in (0, 4, 8)], ['deep', None, 'newer'])
+        table.insert(12, 'deeper', depth = 7)
+        self.assertEqual([table.search(key) for key in (0, 8, 12)], ['deep', None, 'deeper'])
+
+        table = BoundedHashTable(8, 'lru', ways = 2)
+        table.insert(0, 'a')
+        table.insert(4, 'b')
+        table.search(0)
+        table.insert(8, 'c')
+        self.assertEqual([table.search(key) for key in (0, 4, 8)], ['a', None, 'c'])
+
+        # the table never grows
+        for policy in BoundedHashTable.POLICIES:
+            table = BoundedHashTable(100, policy)
+            for key in range(1000):
+                table.insert(key, key, depth = key % 7)
+            self.assertLessEqual(len(table), table.capacity())
+            self.assertLessEqual(table.capacity(), 100)
+            self.assertEqual(table.memory_usage()['total'] > 0, True)
+        self.assertRaises(ValueError, BoundedHashTable, 100, 'random')
+
+
+    def test_snapshot(self):
+        generator = random.Random(9)
+        table = HashTable()
+        for _ in range(500):
+            table.insert(generator.getrandbits(64), generator.randrange(-2 ** 40, 2 ** 40))
+
+        with tempfile.TemporaryDirectory() as directory:
+            # a snapshot answers every lookup like the table it was written from
+            path = os.path.join(directory, 'table.snap')
+            self.assertEqual(write_snapshot(table, path), 500)
+            with SnapshotTable(path) as snapshot:
+                self.assertEqual(len(snapshot), 500)
+                self.assertEqual(snapshot.capacity(), 1001)
+                for key, value in table.items():
+                    self.assertEqual(snapshot.search(key), value)
+                self.assertEqual(snapshot.search(12345), None)
+                self.assertEqual(sorted(snapshot.items()), sorted(table.items()))
+
+            # values with several fields come back as tuples, pairs can come from any iterable
+            path = os.path.join(directory, 'tuples.snap')
+            pairs = [(key * 7, (key % 100, -key, key % 3)) for key in range(300)]
+            write_snapshot(iter(pairs), path, 'bib', load = 0.9)
+            with SnapshotTable(path) as snapshot:
+                self.assertEqual(snapshot.value_format, 'bib')
+                for key, value in pairs:
+                    self.assertEqual(snapshot.search(key), value)
+
+            # other files are refused
+            path = os.path.join(directory, 'other.snap')
+            with open(path, 'wb') as file:
+                file.write(bytes(64))
+            self.assertRaises(ValueError, SnapshotTable, path)
+            self.assertRaises(ValueError, write_snapshot, table, path, 'q', 1.0)
+
+            # truncated files are refused too
+            path = os.path.join(directory, 'table.snap')
+            with open(path, 'rb') as file:
+                data = file.read()
+            for size in (0, 20, len(data) - 8):
+                with open(os.path.join(directory, 'cut.snap'), 'wb') as file:
+                    file.write(data[:size])
+                self.assertRaises(ValueError, SnapshotTable, os.path.join(directory, 'cut.snap'))
+
+            # more pairs than announced, or a key given twice, cannot be written
+            self.assertRaises(ValueError, write_snapshot, iter(pairs), path, 'bib', 0.9, 10)
+            self.assertRaises(ValueError, write_snapshot, [(1, 2), (3, 4), (1, 5)], path)
+            self.assertEqual(write_snapshot(iter(pairs[:5]), path, 'bib', count = 50), 5)
+            with SnapshotTable(path) as snapshot:
+                self.assertEqual(len(snapshot), 5)
+
+    def test_RobinHoodHashTable(self):
+        keys = ["apple", "banana", "strawberry", "mango",
+                "orange", "lichee", "peach", "pear",
+                "grape", "nectarine","blackberry", "clementine",
+                "apricot","cantaloupe", "honeydew", "pineapple",
+                "blueberry", "coconut", "raspberry","cherry",
+                "lettuce", "mushroom", "carrot", "broccoli"]
+
+        table = RobinHoodHashTable()
+        self.assertEqual(table.capacity(), 32)
+        self.assertEqual(len(table), 0)
+
+        # same answers as the chaining table, the capacity doubles once the load passes 0.85
+        for i in range(24):
+            self.assertEqual(table.insert(keys[i], i), True)
+            self.assertEqual(table.insert(keys[i], i + 1), False)
+            self.assertEqual(len(table), i + 1)
+        self.assertEqual(table.capacity(), 32)
+        for i in range(24):
+            self.assertEqual(table.search(keys[i]), i)
+            self.assertEqual(table.modify(keys[i], -i), True)
+        self.assertEqual(table.modify("durian", 1), False)
+        self.assertEqual(table.search("durian"), None)
+        for i in range(0, 24, 2):
+            self.assertEqual(table.remove(keys[i]), True)
+            self.assertEqual(table.remove(keys[i]), False)
+        for i in range(24):
+            self.assertEqual(table.search(keys[i]), None if i % 2 == 0 else -i)
+        self.assertEqual(len(table), 12)
+
+        # keys and values can live in typed arrays, the memory report adds up
+        typed = RobinHoodHashTable(key_type = 'Q', value_type = 'q')
+        for key in range(1, 200):
+            self.assertEqual(typed.insert(key << 40, -key), True)
+        self.assertEqual(typed.insert(1 << 40, 0), False)
+        self.assertEqual(typed.search(5 << 40), -5)
+        self.assertEqual(typed.remove(5 << 40), True)
+        self.assertEqual(typed.search(5 << 40), None)
+        self.assertEqual(len(typed), 198)
+        usage = typed.memory_usage()
+        self.assertEqual(usage['total'], usage['slots'] + usage['keys'] + usage['values'] + usage['overhead'])
+        self.assertLess(usage['keys'], 9 * typed.capacity())
+
+        chained = HashTable()
+        for key in range(1, 200):
+            chained.insert(key << 40, -key)
+        usage = chained.memory_usage()
+        self.assertEqual(usage['total'], usage['slots'] + usage['keys'] + usage['values'] + usage['overhead'])
+        self.assertGreater(usage['total'], 2 * typed.memory_usage()['total'])
+
+        table = RobinHoodHashTable(8, max_load = 0.5)
+        for i in range(5):
+            table.insert(i, i)
+        self.assertEqual(table.capacity(), 16)
+        self.assertRaises(ValueError, RobinHoodHashTable, 8, 1.0)
+
+        # random operations, with many keys sharing a home slot, agree with a dict
+        generator = random.Random(3)
+        table = RobinHoodHashTable(8)
+        expected = {}
+        for step in range(20000):
+            key = generator.randrange(300) * 64
+            operation = generator.randrange(4)
+            if operation == 0:
+                self.assertEqual(table.insert(key, step), key not in expected)
+                expected.setdefault(key, step)
+            elif operation == 1:
+                self.assertEqual(table.remove(key), expected.pop(key, None) is not None)
+            elif operation == 2:
+                self.assertEqual(table.modify(key, step), key in expected)
+                if key in expected:
+                    expected[key] = step
+            else:
+                self.assertEqual(table.search(key), expected.get(key))
+            self.assertEqual(len(table), len(expected))
+
+
 
 if __name__ == '__main__':
     unittest.main()
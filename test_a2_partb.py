@@ -5,7 +5,26 @@
 
 
 import unittest
-from a2_partb import evaluate_board, GameTree
+from a2_partb import evaluate_board, GameTree, IterativeDeepening, TranspositionTable, MoveOrdering
+from a2_partb import get_moves, apply_move, apply_move_hashed, position_key, evaluate_boards
+import a2_partb
+from a1_partd import overflow, set_overflow_backend
+from a1_partc import Queue
+from flatboard import FlatBoard
+from position import Position
+from overflow_cache import OverflowCache
+from snapshot import SnapshotTable
+from book import build_book, book_positions, start_board, OpeningBook, load_book
+from player1 import PlayerOne
+from player2 import PlayerTwo
+from symmetry import canonical, map_move, transform_board, TRANSFORMS, FLIP_VERTICAL
+import gc
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 class A2BTestCase(unittest.TestCase):
     """These are the test cases for functions and classes of a2"""
@@ -133,6 +152,652 @@ class A2BTestCase(unittest.TestCase):
         self.assertNotEqual((row,col), (4,0))
         self.assertNotEqual((row,col), (4,5))
 
+    def test_gametree_alpha_beta(self):
+
+        boards = [
+                    [
+                    [ 0 , 2,  -2, 0, 0,  0],
+                    [ 0,  0 , -3,  -1,  0,  0],
+                    [ 0,  0,  0,  0,  0, 0],
+                    [ 0,  0,  0,  0,  2, 0],
+                    [ 0,  0,  0,  2,  0, 0]
+                    ],
+                    [
+                    [ 0 , 0,  0,  0,  0,  0],
+                    [ -1, 0,  0,  0,  0,  -1],
+                    [ -2, 3,  3,  3,  3, -2],
+                    [ -1, 0,  0,  0,  0, -1],
+                    [ 0,  0,  -2,  -1,  0,  0]
+                    ],
+                    [
+                    [ 1 , 0,  0,  0,  0,  0],
+                    [ 0, 2,  -1,  0,  0,  0],
+                    [ 0, -2,  3,  0,  0, 0],
+                    [ 0, 0,  0,  0,  -2, 0],
+                    [ 0,  0,  0,  0,  0,  -1]
+                    ]
+        ]
+
+    # alpha-beta must pick exactly the move that minimax picks on the full tree
+        for board in boards:
+            for player in (1, -1):
+                for height in (1, 2, 3):
+                    full = GameTree(board, player, height)
+                    pruned = GameTree(board, player, height, alpha_beta = True)
+                    self.assertEqual(pruned.get_move(), full.get_move())
+                    # children are only generated by the search itself
+                    self.assertEqual(pruned.root.children, [])
+
+        tree = GameTree(boards[0], 1, alpha_beta = True)
+        self.assertEqual(tree.get_move(), (0,1))
+
+    def test_iterative_deepening(self):
+
+        board = [
+                [ 0 , 2,  -2, 0, 0,  0],
+                [ 0,  0 , -3,  -1,  0,  0],
+                [ 0,  0,  0,  0,  0, 0],
+                [ 0,  0,  0,  0,  2, 0],
+                [ 0,  0,  0,  2,  0, 0]
+                ]
+
+    # without a budget the deepest iteration decides the move
+        search = IterativeDeepening(1, time_limit = None, max_depth = 3)
+        self.assertEqual(search.get_move(board), GameTree(board, 1, 3).get_move())
+        self.assertEqual(search.completed_depth, 3)
+
+    # an exhausted budget still returns a playable move from the last finished depth
+        search = IterativeDeepening(1, time_limit = None, node_limit = 200, max_depth = 6)
+        (row,col) = search.get_move(board)
+        self.assertLess(search.completed_depth, 6)
+        self.assertTrue(board[row][col] >= 0)
+
+        search = IterativeDeepening(-1, time_limit = 0)
+        (row,col) = search.get_move(board)
+        self.assertEqual(search.completed_depth, 0)
+        self.assertTrue(board[row][col] <= 0)
+
+    # a search kept for the next move resumes below the move played and the reply
+        search = IterativeDeepening(1, time_limit = None, max_depth = 4)
+        move = search.get_move(board)
+        self.assertEqual(search.reused_depth, 0)
+        after = apply_move(board, move, 1)
+        reply = IterativeDeepening(-1, time_limit = None, max_depth = 3).get_move(after)
+        after = apply_move(after, reply, -1)
+        nodes = IterativeDeepening(1, time_limit = None, max_depth = 4)
+        self.assertEqual(search.get_move(after), nodes.get_move(after))
+        self.assertGreater(search.reused_depth, 0)
+        self.assertLess(search.nodes, nodes.nodes)
+        ordering = MoveOrdering()
+        ordering.killers = {0: [(0, 0)], 2: [(1, 1)], 3: [(2, 2)]}
+        ordering.history = {(1, 1): 9}
+        ordering.advance(2)
+        self.assertEqual(ordering.killers, {0: [(1, 1)], 1: [(2, 2)]})
+        self.assertEqual(ordering.history, {(1, 1): 4})
+        self.assertTrue(search.follows_root(Position(apply_move(apply_move(after, (4, 4), 1), (1, 2), -1), 1)))
+        self.assertFalse(search.follows_root(Position(board, 1)))
+
+    # only an exact entry stands for a finished depth, a bound is only a move to try first
+        search = IterativeDeepening(1, time_limit = 0)
+        key = Position(board, 1).key
+        search.table.store(key, 3, 50, a2_partb.LOWER, (0, 1))
+        search.get_move(board)
+        self.assertEqual(search.reused_depth, 0)
+        self.assertEqual(search.completed_depth, 0)
+        search.table.store(key, 3, 50, a2_partb.EXACT, (0, 1))
+        self.assertEqual(search.get_move(board), (0, 1))
+        self.assertEqual(search.reused_depth, 3)
+
+    # the players keep their search between moves
+        player = PlayerOne(time_limit = None, max_depth = 3, book_path = None)
+        first = player.search
+        player.get_play(board)
+        player.max_depth = 2
+        player.get_play(apply_move(apply_move(board, move, 1), reply, -1))
+        self.assertIs(player.search, first)
+        self.assertEqual(player.search.max_depth, 2)
+        self.assertGreater(len(player.search.table), 0)
+
+    def test_transposition_table(self):
+
+        board = [
+                [ 1 , 0,  0,  0,  0,  0],
+                [ 0, 2,  -1,  0,  0,  0],
+                [ 0, -2,  3,  0,  0, 0],
+                [ 0, 0,  0,  0,  -2, 0],
+                [ 0,  0,  0,  0,  0,  -1]
+                ]
+
+    # the table must not change the chosen move
+        for player in (1, -1):
+            table = TranspositionTable()
+            tree = GameTree(board, player, 3, alpha_beta = True, table = table)
+            self.assertEqual(tree.get_move(), GameTree(board, player, 3).get_move())
+            self.assertGreater(len(table), 0)
+            self.assertGreater(table.misses, 0)
+
+    # searching the same position again is answered by the table
+            nodes = tree.nodes
+            hits = table.hits
+            tree = GameTree(board, player, 3, alpha_beta = True, table = table)
+            self.assertEqual(tree.get_move(), GameTree(board, player, 3).get_move())
+            self.assertLess(tree.nodes, nodes)
+            self.assertGreater(table.hits, hits)
+            self.assertGreater(table.cutoffs, 0)
+            self.assertGreater(table.hit_rate(), 0)
+
+    # a compact table packs the same entries into a fraction of the memory
+        tables = [TranspositionTable(), TranspositionTable(compact = True)]
+        for table in tables:
+            for height in (1, 2, 3, 4):
+                move = GameTree(board, 1, height, alpha_beta = True, table = table).get_move()
+            self.assertEqual(move, GameTree(board, 1, 4).get_move())
+        self.assertEqual(len(tables[0]), len(tables[1]))
+        self.assertLess(tables[1].memory_usage()['total'] * 4, tables[0].memory_usage()['total'])
+        for entry in [(4, 37, a2_partb.LOWER, (4, 5)), (0, -100, a2_partb.EXACT, None), (255, 100, a2_partb.UPPER, (0, 0))]:
+            self.assertEqual(a2_partb.unpack_entry(a2_partb.pack_entry(*entry)), entry)
+
+    # a table saved to a snapshot answers a later search through the mapped file
+        for compact in (False, True):
+            table = TranspositionTable(compact = compact)
+            first = GameTree(board, 1, 3, alpha_beta = True, table = table)
+            first.get_move()
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'table.snap')
+                self.assertEqual(table.save(path), len(table))
+                with SnapshotTable(path) as snapshot:
+                    loaded = TranspositionTable(compact = compact, snapshot = snapshot)
+                    tree = GameTree(board, 1, 3, alpha_beta = True, table = loaded)
+                    self.assertEqual(tree.get_move(), GameTree(board, 1, 3).get_move())
+                    self.assertGreater(loaded.hits, 0)
+                    self.assertLess(tree.nodes, first.nodes)
+
+    def test_bounded_transposition_table(self):
+
+        board = [
+                [ 1 , 0,  0,  0,  0,  0],
+                [ 0, 2,  -1,  0,  0,  0],
+                [ 0, -2,  3,  0,  0, 0],
+                [ 0, 0,  0,  0,  -2, 0],
+                [ 0,  0,  0,  0,  0,  -1]
+                ]
+
+    # a bounded table stays within its capacity and only costs extra nodes
+        expected = GameTree(board, -1, 4).get_move()
+        for policy in ('always', 'depth', 'two-tier', 'lru'):
+            table = TranspositionTable(64, policy = policy)
+            for height in (1, 2, 3, 4):
+                move = GameTree(board, -1, height, alpha_beta = True, table = table, ordering = MoveOrdering()).get_move()
+            self.assertEqual(move, expected)
+            self.assertLessEqual(len(table), 64)
+            self.assertGreater(table.table.replacements, 0)
+
+    def test_zobrist_keys(self):
+
+        board = [
+                [ 1 , 0,  0,  0,  0,  0],
+                [ 0, 2,  -1,  0,  0,  0],
+                [ -1, -2,  3,  0,  0, 0],
+                [ 0, 0,  0,  0,  -2, 0],
+                [ 0,  0,  0,  0,  2,  -1]
+                ]
+
+    # the incrementally updated key must equal the key computed from scratch,
+    # including moves that start long overflow cascades
+        for player in (1, -1):
+            key = position_key(board, player)
+            for move in get_moves(board, player):
+                new_board, new_key = apply_move_hashed(board, key, move, player)
+                self.assertEqual(new_board, apply_move(board, move, player))
+                self.assertEqual(new_key, position_key(new_board, -player))
+                for reply in get_moves(new_board, -player):
+                    next_board, next_key = apply_move_hashed(new_board, new_key, reply, -player)
+                    self.assertEqual(next_key, position_key(next_board, player))
+
+        self.assertNotEqual(position_key(board, 1), position_key(board, -1))
+
+    # a count with no key of its own is an error, not another cell's key
+        board[0][0] = 33
+        with self.assertRaises(ValueError):
+            position_key(board, 1)
+        with self.assertRaises(ValueError):
+            canonical(board)
+
+    def test_move_ordering(self):
+
+        boards = [
+                    [
+                    [ 1 , 0,  0,  0,  0,  0],
+                    [ 0, 2,  -1,  0,  0,  0],
+                    [ 0, -2,  3,  0,  0, 0],
+                    [ 0, 0,  0,  0,  -2, 0],
+                    [ 0,  0,  0,  0,  0,  -1]
+                    ],
+                    [
+                    [ 0 , 0,  0,  0,  0,  0],
+                    [ -1, 0,  0,  0,  0,  -1],
+                    [ -2, 3,  3,  3,  3, -2],
+                    [ -1, 0,  0,  0,  0, -1],
+                    [ 0,  0,  -2,  -1,  0,  0]
+                    ]
+        ]
+
+    # reordering the moves must not change which move is picked, ties included
+        for board in boards:
+            for player in (1, -1):
+                ordering = MoveOrdering()
+                table = TranspositionTable()
+                for height in (1, 2, 3):
+                    tree = GameTree(board, player, height, alpha_beta = True, table = table, ordering = ordering)
+                    self.assertEqual(tree.get_move(), GameTree(board, player, height).get_move())
+                self.assertGreater(ordering.cutoffs, 0)
+                self.assertGreater(ordering.first_cutoff_rate(), 0.5)
+
+    # the transposition table move goes first, then the killers
+        ordering = MoveOrdering()
+        ordering.record_cutoff((3, 3), 2, 2, 1)
+        moves = ordering.order(boards[0], [(0, 0), (0, 1), (3, 3), (4, 4)], 1, 2, (4, 4))
+        self.assertEqual(moves[:2], [(4, 4), (3, 3)])
+
+    def test_parallel_root_search(self):
+
+        board = [
+                [ 0 , 0,  0,  0,  0,  0],
+                [ -1, 0,  0,  0,  0,  -1],
+                [ -2, 3,  3,  3,  3, -2],
+                [ -1, 0,  0,  0,  0, -1],
+                [ 0,  0,  -2,  -1,  0,  0]
+                ]
+
+    # the parallel search must pick the same move as minimax, whatever the number of workers
+        for player in (1, -1):
+            expected = GameTree(board, player, 3).get_move()
+            for workers in (1, 2):
+                with GameTree(board, player, 3, alpha_beta = True) as tree:
+                    self.assertEqual(tree.get_move_parallel(workers), expected)
+                    self.assertGreater(tree.nodes, 0)
+    # the pool is kept for the next call, and shut down when the block ends
+                    executor = tree.executor
+                    self.assertEqual(tree.get_move_parallel(workers), expected)
+                    self.assertIs(tree.executor, executor)
+                self.assertIsNone(tree.executor)
+
+    # a tree dropped without closing its pool still shuts it down
+        tree = GameTree(board, 1, 2, alpha_beta = True)
+        tree.get_move_parallel(1)
+        finalizer = tree.finalizer
+        del tree
+        gc.collect()
+        self.assertFalse(finalizer.alive)
+
+    def test_flat_board(self):
+
+        board = [
+                [ 1 , 0,  0,  0,  0,  0],
+                [ 0, 2,  -1,  0,  0,  0],
+                [ -1, -2,  3,  0,  0, 0],
+                [ 0, 0,  0,  0,  -2, 0],
+                [ 0,  0,  0,  0,  2,  -1]
+                ]
+
+        flat = FlatBoard.from_lists(board)
+        self.assertEqual(flat.to_lists(), board)
+        self.assertEqual(len(flat), 5)
+        self.assertEqual(flat[2][1], -2)
+
+    # copies are independent of the original
+        other = flat.copy()
+        other[0][0] += 1
+        self.assertEqual(flat[0][0], 1)
+        self.assertEqual(other[0][0], 2)
+
+    # evaluation, moves and overflow give the same results as on the list-of-lists board
+        for player in (1, -1):
+            self.assertEqual(evaluate_board(flat, player), evaluate_board(board, player))
+            self.assertEqual(get_moves(flat, player), get_moves(board, player))
+            for move in get_moves(board, player):
+                self.assertEqual(apply_move(flat, move, player), apply_move(board, move, player))
+                (row, col) = move
+                grid = [r[:] for r in board]
+                grid[row][col] += player
+                flat_grid = FlatBoard.from_lists(grid)
+                queue, flat_queue = Queue(), Queue()
+                self.assertEqual(overflow(flat_grid, flat_queue), overflow(grid, queue))
+                self.assertEqual(len(flat_queue), len(queue))
+                while not queue.is_empty():
+                    self.assertEqual(flat_queue.dequeue(), queue.dequeue())
+
+        self.assertEqual(GameTree(flat, 1, 2, alpha_beta = True).get_move(), GameTree(board, 1, 2).get_move())
+
+    def test_evaluate_boards(self):
+
+        boards = [
+                    [
+                    [ 1 , 0,  2,  0, 0,  0],
+                    [ 0,  2 , 0,  0,  0,  0],
+                    [ 2,  0,  3,  0,  0, 0],
+                    [ 0,  0,  0,  -3,  0, 0],
+                    [ 0,  0,  0,  0, -2, -1]
+                    ],
+                    [
+                    [ 0 , -1,  -2,  0, 0,  0],
+                    [ -1,  -2 , 0,  0,  0,  0],
+                    [ -2,  0,  -3,  0,  0, 0],
+                    [ 0,  0,  0,  0,  0, 0],
+                    [ 0,  0,  0,  0,  0, 0]
+                    ],
+                    [[0] * 6 for _ in range(5)],
+                    [
+                    [ 7 , 0,  0,  0, 0,  0],
+                    [ 0,  0 , 0,  0,  0,  0],
+                    [ 0,  0,  0,  0,  0, 0],
+                    [ 0,  0,  0,  0,  0, 0],
+                    [ 0,  0,  0,  0,  0, -1]
+                    ]
+        ]
+
+    # the batch must follow exactly the same rules as evaluate_board
+        for player in (1, -1):
+            expected = [evaluate_board(board, player) for board in boards]
+            self.assertEqual(evaluate_boards(boards, player), expected)
+            self.assertEqual(evaluate_boards([FlatBoard.from_lists(board) for board in boards], player), expected)
+            if a2_partb.numpy is not None:
+                self.assertEqual(evaluate_boards(a2_partb.numpy.array(boards), player), expected)
+        self.assertEqual(evaluate_boards([], 1), [])
+
+    # a tree scores its leaves in one batch, but its nodes still give lists of rows
+        tree = GameTree(boards[0], 1, 2)
+        self.assertIsInstance(tree.root.board, list)
+        self.assertEqual(tree.root.board, boards[0])
+        child = tree.root.children[0]
+        self.assertEqual(child.board, apply_move(boards[0], child.move, 1))
+        self.assertIsInstance(child.board[0], list)
+        self.assertIs(child.board, child.board)
+        with self.assertRaises(AttributeError):
+            child.board = boards[0]
+
+    def test_position(self):
+        generator = random.Random(5)
+
+    # the running totals must always agree with a full scan of the board
+        for game in range(20):
+            board = [[0] * 6 for _ in range(5)]
+            board[0][0] = 1
+            board[4][5] = -1
+            position = Position(board, 1)
+            for turn in range(30):
+                moves = get_moves(position.board, position.player)
+                move = generator.choice(moves)
+                expected_board = apply_move(position.board, move, position.player)
+                position.play(move)
+                self.assertEqual(position.board, expected_board)
+                self.assertEqual(position.key, position_key(position.board, position.player))
+                for player in (1, -1):
+                    self.assertEqual(position.evaluate(player), evaluate_board(position.board, player))
+                    self.assertEqual(position.cells[player], sum(1 for cell in position.board.cells if cell * player > 0))
+                if position.winner() != 0:
+                    cells = position.board.cells
+                    self.assertTrue(all(cell * position.winner() >= 0 for cell in cells))
+                    break
+
+    # undoing moves restores every part of the position, in reverse order
+        position = Position(board, 1)
+        states = []
+        for turn in range(12):
+            states.append((position.board.copy(), position.player, position.key, dict(position.pieces), dict(position.cells)))
+            position.play(generator.choice(get_moves(position.board, position.player)))
+        while states:
+            position.undo()
+            self.assertEqual((position.board, position.player, position.key, position.pieces, position.cells), states.pop())
+        self.assertRaises(IndexError, position.undo)
+
+    # searching in place or on copies visits the same positions
+        for height in (2, 3):
+            in_place = GameTree(board, -1, height, alpha_beta = True)
+            copies = GameTree(board, -1, height, alpha_beta = True, in_place = False)
+            self.assertEqual(in_place.get_move(), copies.get_move())
+            self.assertEqual(in_place.nodes, copies.nodes)
+
+    # copies do not share state
+        position = Position(board, 1)
+        other = position.copy()
+        other.play((0, 0))
+        self.assertNotEqual(other.key, position.key)
+        self.assertEqual(position.board, board)
+
+    # the search resolves cascades with the engine set_overflow_backend chose
+        if a2_partb.numpy is not None:
+            set_overflow_backend('numpy')
+            try:
+                position = Position(board, 1)
+                for turn in range(12):
+                    moves = get_moves(position.board, position.player)
+                    move = generator.choice(moves)
+                    expected_board = apply_move(position.board, move, position.player)
+                    position.play(move)
+                    self.assertEqual(position.board, expected_board)
+                    self.assertEqual(position.key, position_key(position.board, position.player))
+                    if position.winner() != 0:
+                        break
+                while len(position.history) > 0:
+                    position.undo()
+                self.assertEqual(position.board, board)
+            finally:
+                set_overflow_backend('auto')
+
+
+    def test_symmetry(self):
+        generator = random.Random(11)
+
+    # a position, its mirror images and its colour-swapped versions share one canonical form
+        for game in range(10):
+            board = [[0] * 6 for _ in range(5)]
+            position = Position(board, 1, symmetric = True)
+            for turn in range(generator.randrange(1, 15)):
+                moves = get_moves(position.board, position.player)
+                position.play(generator.choice(moves))
+            (form, transform, swapped) = canonical(position.board, position.player)
+            self.assertEqual(swapped, position.player == -1)
+            self.assertEqual(transform_board(position.board, transform, swapped), form)
+            (key, key_transform) = position.canonical_key()
+            self.assertEqual(key_transform, transform)
+            for other_transform in TRANSFORMS:
+                for swap in (False, True):
+                    player = -position.player if swap else position.player
+                    other = transform_board(position.board, other_transform, swap)
+                    self.assertEqual(canonical(other, player)[0], form)
+                    self.assertEqual(Position(other, player, symmetric = True).canonical_key()[0], key)
+            # the keys follow undo as well
+            keys = list(position.symmetric)
+            position.play(get_moves(position.board, position.player)[0])
+            position.undo()
+            self.assertEqual(position.symmetric, keys)
+
+    # moves map to the canonical board and back
+        board = [[1, 0, 0], [0, 0, -2]]
+        (form, transform, swapped) = canonical(board, 1, swap_colors = False)
+        for move in [(0, 0), (1, 2), (0, 1)]:
+            mapped = map_move(move, transform, 2, 3)
+            self.assertEqual(form[mapped[0]][mapped[1]], board[move[0]][move[1]])
+            self.assertEqual(map_move(mapped, transform, 2, 3), move)
+
+    # mirrored positions share table entries and the search still picks the minimax move
+        for start in range(8):
+            board = [[0] * 6 for _ in range(5)]
+            player = 1
+            for turn in range(start):
+                board = apply_move(board, generator.choice(get_moves(board, player)), player)
+                player = -player
+            expected = GameTree(board, player, 3).get_move()
+            table = TranspositionTable()
+            for height in (1, 2, 3):
+                move = GameTree(board, player, height, alpha_beta = True, table = table, ordering = MoveOrdering(), symmetric = True).get_move()
+            self.assertEqual(move, expected)
+        sizes = []
+        for symmetric in (False, True):
+            table = TranspositionTable()
+            GameTree([[0] * 6 for _ in range(5)], 1, 3, alpha_beta = True, table = table, symmetric = symmetric).get_move()
+            sizes.append(len(table))
+        self.assertLess(sizes[1], sizes[0])
+
+    def test_overflow_cache(self):
+        generator = random.Random(17)
+
+    # positions replaying cascades from a shared cache stay identical to ones resolving them
+        cache = OverflowCache()
+        for game in range(10):
+            plain = Position([[0] * 6 for _ in range(5)], 1)
+            cached = Position([[0] * 6 for _ in range(5)], 1, cache = cache)
+            for turn in range(25):
+                move = generator.choice(get_moves(plain.board, plain.player))
+                self.assertEqual(cached.play(move), plain.play(move))
+                self.assertEqual((cached.board, cached.key, cached.pieces, cached.cells), (plain.board, plain.key, plain.pieces, plain.cells))
+                self.assertEqual(sorted(cached.unstable), sorted(plain.unstable))
+                # play it again from the cache
+                cached.undo()
+                cached.play(move)
+                self.assertEqual(cached.board, plain.board)
+                if turn > 1 and plain.winner() != 0:
+                    break
+        self.assertGreater(cache.hits, 0)
+        self.assertGreater(cache.hit_rate(), 0)
+
+    # the full tree built through the cache is the same
+        cache = OverflowCache()
+        for board in ([[0, 0, -2, 1, 0, 0], [0, 2, 2, 0, 0, 0], [0, -1, 3, -2, 0, 0], [0, 0, 1, 0, 0, 0], [0, 0, 0, 0, 0, 0]],
+                      [[1, 0, 0, 0, 0, 0], [0, 2, -1, 0, 0, 0], [0, -2, 3, 0, 1, 0], [0, -1, 0, 0, -2, 0], [0, 0, 0, 0, 0, -1]]):
+            for player in (1, -1):
+                self.assertEqual(GameTree(board, player, 3, cache = cache).get_move(), GameTree(board, player, 3).get_move())
+                key = position_key(board, player)
+                for move in get_moves(board, player):
+                    self.assertEqual(apply_move_hashed(board, key, move, player, cache), apply_move_hashed(board, key, move, player))
+
+    # the least recently used cascade goes first once a limit is reached
+        cache = OverflowCache(max_entries = 2)
+        cache.store(1, 0, [0, 1], [0, 1], 1)
+        cache.store(2, 0, [0, 1], [0, 1], 1)
+        self.assertIsNotNone(cache.lookup(1, 0))
+        cache.store(3, 0, [0, 1], [0, 1], 1)
+        self.assertEqual(cache.evictions, 1)
+        self.assertIsNone(cache.lookup(2, 0))
+        self.assertIsNotNone(cache.lookup(1, 0))
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+        self.assertFalse(cache.store(4, 0, [0], [1], 0))
+
+        cache = OverflowCache(max_bytes = 1)
+        cache.store(1, 0, [0], [1], 1)
+        self.assertEqual((len(cache), cache.bytes, cache.evictions), (0, 0, 1))
+
+    def test_opening_book(self):
+        # the first move and every reply to it, mirror images counted once
+        positions = book_positions(2)
+        self.assertEqual(positions[0], (start_board(), 1))
+        self.assertEqual(len(positions), 30)
+        self.assertTrue(all(player == -1 for board, player in positions[1:]))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'book.bin')
+            self.assertEqual(build_book(path, plies = 2, depth = 2), 30)
+            book = OpeningBook(path)
+
+            # the book gives the move the search picks, in the position as it is on the board
+            for board, player in positions[:6]:
+                self.assertEqual(book.lookup(board, player), IterativeDeepening(player, None, max_depth = 2).get_move(board))
+            # a mirror image of a book position gets the mirrored move
+            board = apply_move(start_board(), (0, 1), 1)
+            mirrored = [row[:] for row in reversed(board)]
+            move = book.lookup(board, -1)
+            self.assertEqual(book.lookup(mirrored, -1), map_move(move, FLIP_VERTICAL, 5, 6))
+            self.assertEqual(book.lookup(apply_move(board, move, -1), 1), None)
+            self.assertEqual((book.hits, book.misses), (8, 1))
+            self.assertAlmostEqual(book.hit_rate(), 8 / 9)
+
+            # players answer from the book while the position is in it, and search after
+            player_one = PlayerOne(book_path = path, max_depth = 2)
+            player_two = PlayerTwo(book_path = path, max_depth = 2)
+            self.assertIsNot(player_one.book, player_two.book)
+            self.assertEqual(player_one.get_play(start_board()), book.lookup(start_board(), 1))
+            self.assertEqual(player_one.book.hits, 1)
+            self.assertEqual(player_two.get_play(board), book.lookup(board, -1))
+            later = apply_move(board, (1, 1), -1)
+            self.assertIn(player_one.get_play(later), get_moves(later, 1))
+            self.assertEqual(player_one.book.misses, 1)
+
+            # closing one player's book leaves the other's open
+            player_one.book.close()
+            self.assertEqual(player_two.book.lookup(board, -1), book.lookup(board, -1))
+            player_two.book.close()
+            book.close()
+        self.assertIsNone(load_book(os.path.join(directory, 'missing.bin')))
+        self.assertIsNone(PlayerOne(book_path = None).book)
+
+    def test_pondering(self):
+        board = apply_move(start_board(), (0, 0), 1)
+        player = PlayerTwo(time_limit = None, max_depth = 3, book_path = None, ponder = True)
+        move = player.get_play(board)
+        after = apply_move(board, move, -1)
+        ponderer = player.ponderer
+        self.assertEqual(ponderer.board, apply_move(after, ponderer.predict(after), 1))
+        self.assertIsNotNone(ponderer.thread)
+
+    # the predicted reply: the work of the background search gives the move
+        expected = IterativeDeepening(-1, time_limit = None, max_depth = 3).get_move(ponderer.board)
+        self.assertEqual(player.get_play(ponderer.board), expected)
+        self.assertEqual(ponderer.hits, 1)
+        self.assertGreaterEqual(player.search.completed_depth, 1)
+
+    # another reply: the pondering is thrown away and the player searches the real board
+        predicted = ponderer.board
+        replies = [reply for reply in get_moves(ponderer.board, 1) if apply_move(predicted, reply, 1) != ponderer.board]
+        real = apply_move(predicted, replies[0], 1)
+        self.assertIn(player.get_play(real), get_moves(real, -1))
+        self.assertEqual(ponderer.misses, 1)
+        self.assertEqual(ponderer.hit_rate(), 0.5)
+
+    # a search too deep to finish is cancelled at once
+        player.stop_pondering()
+        player.search.max_depth = 30
+        self.assertTrue(ponderer.start(after))
+        self.assertTrue(ponderer.pondering())
+        player.stop_pondering()
+        self.assertFalse(ponderer.pondering())
+        self.assertIsNone(ponderer.thread)
+        self.assertIsNone(player.search.stop)
+        self.assertEqual((player.search.time_limit, player.search.node_limit), (None, None))
+
+    # a bot with only a node budget ponders within it and gets its budget back
+        player = PlayerTwo(time_limit = None, node_limit = 2000, max_depth = 30, book_path = None, ponder = True)
+        move = player.get_play(board)
+        ponderer = player.ponderer
+        self.assertIsNotNone(ponderer.thread)
+        self.assertIn(player.get_play(ponderer.board), get_moves(ponderer.board, -1))
+        self.assertEqual(ponderer.hits, 1)
+        player.stop_pondering()
+        self.assertEqual((player.search.time_limit, player.search.node_limit), (None, 2000))
+
+    def test_cancel_play(self):
+        board = apply_move(start_board(), (0, 0), 1)
+        player = PlayerTwo(time_limit = None, max_depth = 30, book_path = None, ponder = True)
+    # a stop set before the call starts is not lost
+        stop = threading.Event()
+        stop.set()
+        self.assertIn(player.get_play(board, stop), get_moves(board, -1))
+        self.assertIsNone(player.ponderer.thread)
+        with ThreadPoolExecutor(max_workers = 1) as worker:
+            stop = threading.Event()
+            thinking = worker.submit(player.get_play, board, stop)
+            time.sleep(0.05)
+            self.assertFalse(thinking.done())
+            stop.set()
+            self.assertIn(thinking.result(timeout = 5), get_moves(board, -1))
+        self.assertIsNone(player.search.stop)
+        self.assertIsNone(player.ponderer.thread)
+
+    # a stop only ends the get_play it was passed to
+        player.max_depth = 2
+        player.ponder = False
+        self.assertIn(player.get_play(board), get_moves(board, -1))
+        self.assertEqual(player.search.completed_depth, 2)
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,90 @@
+#    Main Author(s): Ahmed Kursi
+#    Main Reviewer(s): Ahmed Kursi
+
+import random
+
+# A cell never holds more than a handful of pieces, even halfway through an overflow
+# cascade, so every cell gets a random key for each count in -MAX_COUNT..MAX_COUNT.
+# A larger count has no key of its own and is refused rather than hashed as another cell
+MAX_COUNT = 32
+
+class Zobrist:
+    """
+    Zobrist hashing of boards: a board's key is the XOR of one random 64-bit number per
+    (cell, signed count) pair, plus one more when player -1 is to move.
+
+    Because XOR is its own inverse, changing a cell from old to new only needs the key
+    to be XORed with the numbers of old and new, so a key can follow a board through
+    moves and overflow cascades in O(changed cells) instead of being rebuilt from all cells.
+    """
+
+    def __init__(self, rows, cols, seed=0x5EED):
+        """
+        Creates the random numbers for a rows x cols board.
+
+        Args:
+            rows (int): Number of rows of the board.
+            cols (int): Number of columns of the board.
+            seed (int): Seed for the random numbers. Tables with the same seed and shape give the same keys.
+        """
+        self.rows = rows
+        self.cols = cols
+        self.span = 2 * MAX_COUNT + 1
+        generator = random.Random(seed)
+        self.keys = [generator.getrandbits(64) for _ in range(rows * cols * self.span)]
+        # Empty cells add nothing, so the empty board with player 1 to move has key 0
+        for cell in range(rows * cols):
+            self.keys[cell * self.span + MAX_COUNT] = 0
+        self.side = generator.getrandbits(64)
+
+    def cell_key(self, row, col, value):
+        """
+        Returns the random number of a cell holding value (negative for player -1).
+
+        Raises:
+            ValueError: If value is more than MAX_COUNT pieces.
+        """
+        if not -MAX_COUNT <= value <= MAX_COUNT:
+            raise ValueError(f'a cell cannot hold {value} pieces, the keys go up to {MAX_COUNT}')
+        return self.keys[(row * self.cols + col) * self.span + value + MAX_COUNT]
+
+    def key_of(self, board, player=1):
+        """
+        Computes the key of a board from scratch.
+
+        Args:
+            board (list): The board as a list of rows.
+            player (int): The player to move, 1 or -1.
+
+        Returns:
+            int: The 64-bit key of the position.
+        """
+        key = self.side if player == -1 else 0
+        for row in range(self.rows):
+            for col in range(self.cols):
+                if board[row][col] != 0:
+                    key ^= self.cell_key(row, col, board[row][col])
+        return key
+
+    def update(self, key, row, col, old, new):
+        """
+        Returns the key after one cell changed from old to new.
+        """
+        return key ^ self.cell_key(row, col, old) ^ self.cell_key(row, col, new)
+
+    def toggle_side(self, key):
+        """
+        Returns the key with the other player to move.
+        """
+        return key ^ self.side
+
+# Tables are shared per board shape, so keys from different searches can be compared
+_tables = {}
+
+def get_zobrist(rows, cols):
+    """
+    Returns the shared Zobrist table for rows x cols boards.
+    """
+    if (rows, cols) not in _tables:
+        _tables[(rows, cols)] = Zobrist(rows, cols)
+    return _tables[(rows, cols)]